@@ -0,0 +1,94 @@
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import engine
+from compact_board import CompactBoard
+from engine import EngineConfig, MinMaxArg
+from util import cell_to_string
+
+# Result of the analysis of one position, the cells are None if there is no move left
+AnalysisResult = namedtuple("AnalysisResult", ["index", "move_from", "move_to", "score", "nodes"])
+
+# Boards reused by the analysis in this process, one per backend
+_boards = {}
+
+
+def _analyse_chunk(chunk, backend, depth, playAsWhite, config, loader):
+    """
+    Analyses a list of (index, board configuration) pairs on a board reused for all of them.
+
+    :return: A list of :py:class:`AnalysisResult`
+    """
+    board = _boards.get(backend)
+    if board is None:
+        board = _boards[backend] = backend()
+
+    results = []
+    for index, configuration in chunk:
+        getattr(board, loader)(configuration)
+
+        engine.total_nodes = 0
+        engine.start_search(config)
+        move = engine.minMaxAlphaBeta_cached(board, MinMaxArg(depth, playAsWhite, config=config))
+
+        if move.piece is None:
+            results.append(AnalysisResult(index, None, None, move.score, engine.total_nodes))
+        else:
+            results.append(AnalysisResult(index, cell_to_string(move.piece.cell), cell_to_string(move.cell), move.score, engine.total_nodes))
+
+    return results
+
+
+def _chunks(positions, chunk_size):
+    """
+    Yields lists of up to chunk_size (index, position) pairs without reading ahead any further
+    """
+    iterator = enumerate(positions)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def analyse_batch(positions, depth=3, workers=1, playAsWhite=True, backend=CompactBoard, config=None, chunk_size=16,
+                  loader="load_from_memory"):
+    """
+    Searches the best move for many positions and yields the results in the order of the positions.
+
+    The positions are read lazily and only a few chunks per worker are in flight at any time, so the memory stays flat
+    no matter how many positions there are. Every process loads all its positions into the same board.
+    The bounded caches (e.g. board.shared_check_cache) exist once per process. If memory is tight with many workers,
+    shrink them with their resize method before calling this function, forked worker processes inherit the capacity.
+
+    :param positions: Iterable of board configurations in the format of the loader, e.g. a :py:class:`PositionFile <positions.PositionFile>`
+        or :py:func:`read_positions <positions.read_positions>` with loader="load_from_hash"
+    :param depth: Search depth
+    :param workers: Number of processes, 1 analyses in this process
+    :param playAsWhite: True if white is to move in all positions
+    :param backend: Board class to use
+    :param config: The :py:class:`EngineConfig <engine.EngineConfig>` of the searches, defaults to a deterministic one
+    :param chunk_size: Number of positions sent to a worker at once
+    :param loader: Name of the board method loading a configuration, "load_from_memory", "load_from_hash" or "load_from_fen"
+    :return: Generator of :py:class:`AnalysisResult`
+    """
+    if config is None:
+        config = EngineConfig(depth, deterministic=True)
+
+    if workers <= 1:
+        for chunk in _chunks(positions, chunk_size):
+            yield from _analyse_chunk(chunk, backend, depth, playAsWhite, config, loader)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in _chunks(positions, chunk_size):
+            pending.append(executor.submit(_analyse_chunk, chunk, backend, depth, playAsWhite, config, loader))
+
+            # Keep every worker busy, but don't read further ahead than that
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
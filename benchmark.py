@@ -0,0 +1,162 @@
+import json
+import sys
+import time
+
+import engine
+import board as board_module
+from board import Board
+from perft import BACKENDS, benchmark_positions, load_position, perft
+
+
+def _rate(hits, total):
+    """
+    Returns hits / total or 0.0 if nothing was counted
+    """
+    return hits / total if total else 0.0
+
+
+def run_search(name, depth, alphaBeta=True, seed=0, backend=Board, deterministic=False):
+    """
+    Runs a single search of the given depth on the given benchmark position, starting with empty caches.
+
+    :return: A dictionary with the suggested move and the statistics of this search
+    """
+    board = backend()
+    load_position(board, name)
+
+    # Every search starts from the same state, so runs can be compared with each other
+    config = engine.EngineConfig(depth=depth, seed=seed, deterministic=deterministic)
+    engine.eval_cache.clear()
+    engine.clear_move_ordering()
+    engine.total_nodes = 0
+    engine.total_hits = 0
+    board.check_cache.clear()
+    board_module.legal_move_cache.clear()
+
+    start = time.perf_counter()
+    move = engine.suggest_move(board, alphaBeta, config=config)
+    seconds = time.perf_counter() - start
+
+    check_lookups = board.check_cache.hits + board.check_cache.misses
+    legal_move_cache = board_module.legal_move_cache
+    legal_move_lookups = legal_move_cache.hits + legal_move_cache.misses
+    return {
+        "position": name,
+        "depth": depth,
+        "move": str(move) if move.piece is not None else None,
+        "score": move.score,
+        "nodes": engine.total_nodes,
+        "seconds": seconds,
+        "nodes_per_second": engine.total_nodes / seconds if seconds > 0 else 0.0,
+        "eval_cache_probes": engine.eval_cache.probes,
+        "eval_cache_hit_rate": _rate(engine.eval_cache.hits, engine.eval_cache.probes),
+        "check_cache_lookups": check_lookups,
+        "check_cache_hit_rate": _rate(board.check_cache.hits, check_lookups),
+        "legal_move_cache_lookups": legal_move_lookups,
+        "legal_move_cache_hit_rate": _rate(legal_move_cache.hits, legal_move_lookups),
+    }
+
+
+def run_benchmark(max_depth=3, alphaBeta=True, seed=0, backend=Board, deterministic=False):
+    """
+    Runs suggest_move on all benchmark positions (see :py:func:`perft.benchmark_positions`) for depth 1 up to max_depth.
+
+    :return: The report as a dictionary, ready to be written as JSON
+    """
+    searches = [
+        run_search(name, depth, alphaBeta, seed, backend, deterministic)
+        for name in benchmark_positions()
+        for depth in range(1, max_depth + 1)
+    ]
+
+    total_nodes = sum(search["nodes"] for search in searches)
+    total_seconds = sum(search["seconds"] for search in searches)
+    return {
+        "backend": backend.__name__,
+        "alphaBeta": alphaBeta,
+        "seed": seed,
+        "deterministic": deterministic,
+        "max_depth": max_depth,
+        "total_nodes": total_nodes,
+        "total_seconds": total_seconds,
+        "nodes_per_second": total_nodes / total_seconds if total_seconds > 0 else 0.0,
+        "searches": searches,
+    }
+
+
+def run_load_benchmark(repeat=200, backend=Board):
+    """
+    Compares loading the benchmark positions with :py:meth:`load_from_memory <board.BoardBase.load_from_memory>`
+    and :py:meth:`load_from_fen <board.BoardBase.load_from_fen>`.
+
+    :param repeat: Number of times every position is loaded
+    :return: The report as a dictionary, ready to be written as JSON
+    """
+    board = backend()
+    configurations = []
+    fens = []
+    for name in benchmark_positions():
+        load_position(board, name)
+        configurations.append(str(board))
+        fens.append(board.to_fen())
+
+    report = {"backend": backend.__name__, "positions": len(fens), "repeat": repeat}
+    for method, inputs in (("load_from_memory", configurations), ("load_from_fen", fens)):
+        load = getattr(board, method)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for value in inputs:
+                load(value)
+        seconds = time.perf_counter() - start
+        report[method] = {"seconds": seconds, "positions_per_second": repeat * len(inputs) / seconds if seconds > 0 else 0.0}
+
+    return report
+
+
+def run_perft_benchmark(depth=3, backends=BACKENDS):
+    """
+    Compares the board backends by running perft of the given depth on all benchmark positions with each of them.
+    All backends generate the same moves, so the node counts must be equal and only the speed differs.
+
+    :param backends: Dictionary from name to board class, see :py:data:`perft.BACKENDS`
+    :return: The report as a dictionary, ready to be written as JSON
+    """
+    report = {"depth": depth, "positions": len(benchmark_positions()), "backends": {}}
+    for name, backend in backends.items():
+        nodes = 0
+        seconds = 0.0
+        for position in benchmark_positions():
+            board = backend()
+            load_position(board, position)
+
+            start = time.perf_counter()
+            nodes += perft(board, depth)
+            seconds += time.perf_counter() - start
+
+        report["backends"][name] = {
+            "nodes": nodes,
+            "seconds": seconds,
+            "nodes_per_second": nodes / seconds if seconds > 0 else 0.0,
+        }
+
+    return report
+
+
+if __name__ == "__main__":
+    # Usage: python benchmark.py [max_depth|load|perft] [board|compact|bitboard] [report.json]
+    backend = BACKENDS[sys.argv[2]] if len(sys.argv) > 2 else Board
+    if len(sys.argv) > 1 and sys.argv[1] == "load":
+        report = run_load_benchmark(backend=backend)
+    elif len(sys.argv) > 1 and sys.argv[1] == "perft":
+        # Compares all backends, unless one is given
+        report = run_perft_benchmark(backends={sys.argv[2]: backend} if len(sys.argv) > 2 else BACKENDS)
+    else:
+        max_depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+        report = run_benchmark(max_depth, backend=backend)
+
+    if len(sys.argv) > 3:
+        with open(sys.argv[3], "wt") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
@@ -0,0 +1,327 @@
+from board import ZOBRIST_KEYS
+from compact_board import CompactBoard
+from pieces import (
+    Pawn, Rook, Bishop, Queen, King, Knight,
+    PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, BLACK, SIGNED_PIECE_VALUES, CELLS,
+)
+
+# Bit (row * 8 + col) of a 64 bit integer represents the cell (row, col)
+FULL = (1 << 64) - 1
+NOT_FILE_A = 0xFEFEFEFEFEFEFEFE
+NOT_FILE_H = 0x7F7F7F7F7F7F7F7F
+NOT_FILE_AB = 0xFCFCFCFCFCFCFCFC
+NOT_FILE_GH = 0x3F3F3F3F3F3F3F3F
+ROW_3 = 0x0000000000FF0000
+ROW_6 = 0x0000FF0000000000
+
+
+def _knight_attacks(bit):
+    """
+    Returns the mask of all cells a knight on the given bit attacks
+    """
+    return (
+        ((bit << 17) & NOT_FILE_A) | ((bit << 15) & NOT_FILE_H)
+        | ((bit << 10) & NOT_FILE_AB) | ((bit << 6) & NOT_FILE_GH)
+        | ((bit >> 17) & NOT_FILE_H) | ((bit >> 15) & NOT_FILE_A)
+        | ((bit >> 10) & NOT_FILE_GH) | ((bit >> 6) & NOT_FILE_AB)
+    ) & FULL
+
+
+def _king_attacks(bit):
+    """
+    Returns the mask of all cells a king on the given bit attacks
+    """
+    return (
+        (bit << 8) | (bit >> 8)
+        | ((bit << 1) & NOT_FILE_A) | ((bit >> 1) & NOT_FILE_H)
+        | ((bit << 9) & NOT_FILE_A) | ((bit << 7) & NOT_FILE_H)
+        | ((bit >> 7) & NOT_FILE_A) | ((bit >> 9) & NOT_FILE_H)
+    ) & FULL
+
+
+def _pawn_attacks(bit, white):
+    """
+    Returns the mask of the cells a pawn of the given color on the given bit can hit on
+    """
+    if white:
+        return (((bit << 9) & NOT_FILE_A) | ((bit << 7) & NOT_FILE_H)) & FULL
+    return ((bit >> 7) & NOT_FILE_A) | ((bit >> 9) & NOT_FILE_H)
+
+
+def _ray(square, shift, mask):
+    """
+    Returns the mask of all cells from the given square (excluding it) in the direction of a shift by the given amount.
+    Positive shifts move to higher, negative shifts to lower squares. The mask removes wrap-arounds over the edge of the board.
+    """
+    bit = 1 << square
+    ray = 0
+    while True:
+        bit = ((bit << shift) if shift > 0 else (bit >> -shift)) & mask & FULL
+        if not bit:
+            return ray
+        ray |= bit
+
+
+KNIGHT_ATTACKS = [_knight_attacks(1 << square) for square in range(64)]
+KING_ATTACKS = [_king_attacks(1 << square) for square in range(64)]
+PAWN_ATTACKS = {white: [_pawn_attacks(1 << square, white) for square in range(64)] for white in (True, False)}
+
+# Ray masks per direction, the flag tells whether the ray runs towards higher squares
+ROOK_DIRECTIONS = [
+    ([_ray(square, shift, mask) for square in range(64)], shift > 0)
+    for shift, mask in ((8, FULL), (1, NOT_FILE_A), (-8, FULL), (-1, NOT_FILE_H))
+]
+BISHOP_DIRECTIONS = [
+    ([_ray(square, shift, mask) for square in range(64)], shift > 0)
+    for shift, mask in ((9, NOT_FILE_A), (7, NOT_FILE_H), (-7, NOT_FILE_A), (-9, NOT_FILE_H))
+]
+
+
+def sliding_attacks(square, occupied, directions):
+    """
+    Returns the mask of all cells a sliding piece on the given square attacks along the given directions.
+    Each ray is cut off behind the first occupied cell, which is found as the lowest or highest set bit of the blockers.
+    """
+    attacks = 0
+    for rays, upwards in directions:
+        ray = rays[square]
+        blockers = ray & occupied
+        if blockers:
+            first = (blockers & -blockers).bit_length() - 1 if upwards else blockers.bit_length() - 1
+            ray ^= rays[first]
+        attacks |= ray
+    return attacks
+
+
+class BitboardPiece:
+    """
+    Mixin for pieces placed on a :py:class:`BitBoard`, their reachable cells are generated from the bitboards.
+    """
+
+    def get_reachable_cells(self):
+        return self.board.generate_reachable_cells(self)
+
+
+class BitboardPawn(BitboardPiece, Pawn):
+    pass
+
+
+class BitboardRook(BitboardPiece, Rook):
+    pass
+
+
+class BitboardKnight(BitboardPiece, Knight):
+    pass
+
+
+class BitboardBishop(BitboardPiece, Bishop):
+    pass
+
+
+class BitboardQueen(BitboardPiece, Queen):
+    pass
+
+
+class BitboardKing(BitboardPiece, King):
+    pass
+
+
+class BitBoard(CompactBoard):
+    """
+    Board backend keeping one 64 bit integer per piece code (12 piece sets) and the occupied cells per color,
+    next to the piece objects per square. These are the only state it maintains: the piece codes, the pieces per color
+    and the kings of :py:class:`CompactBoard` are derived from the bitboards when needed.
+
+    Making and taking back a move is a single XOR of the from and to bits per bitboard. Reachable cells are generated
+    with shifts and precomputed masks and the king check is a handful of bitwise ANDs between the attack masks of the
+    kings square and the opposing piece sets. It implements the same API as :py:class:`board.Board`.
+    """
+    piece_classes = {PAWN: BitboardPawn, ROOK: BitboardRook, KNIGHT: BitboardKnight,
+                     BISHOP: BitboardBishop, QUEEN: BitboardQueen, KING: BitboardKing}
+
+    def clear_board(self):
+        """
+        Clears to board, deleting all pieces currently placed on it
+        """
+        self.squares = [None] * 64
+        self.bitboards = [0] * 16
+        self.occupied = {True: 0, False: 0}
+        self.zobrist = 0
+        self.material = 0
+        self.undo_stack = []
+
+    @property
+    def codes(self):
+        """
+        The piece codes per square (see :py:class:`CompactBoard`), built from the pieces
+        """
+        return bytearray(0 if piece is None else piece.code for piece in self.squares)
+
+    def _replace_piece(self, square, old_piece, piece):
+        """
+        Updates the bitboards, zobrist key and material when old_piece (or None) on the given square is replaced by piece (or None)
+        """
+        bit = 1 << square
+        if old_piece is not None:
+            self.bitboards[old_piece.code] &= ~bit
+            self.occupied[old_piece.white] &= ~bit
+            self.zobrist ^= ZOBRIST_KEYS[old_piece.code][square]
+            self.material -= SIGNED_PIECE_VALUES[old_piece.code]
+
+        if piece is not None:
+            self.bitboards[piece.code] |= bit
+            self.occupied[piece.white] |= bit
+            self.zobrist ^= ZOBRIST_KEYS[piece.code][square]
+            self.material += SIGNED_PIECE_VALUES[piece.code]
+
+        self.squares[square] = piece
+
+    def make_move(self, piece, cell):
+        """
+        Moves the piece to the given cell like :py:meth:`BoardBase.make_move <board.BoardBase.make_move>`,
+        flipping the from and to bits of the bitboards at once
+        """
+        row, col = cell
+        to = int(row) * 8 + int(col)
+        origin = piece.cell
+        row, col = origin
+        start = int(row) * 8 + int(col)
+
+        squares = self.squares
+        captured = squares[to]
+        self.undo_stack.append((piece, origin, captured, self.zobrist, self.material))
+
+        code = piece.code
+        keys = ZOBRIST_KEYS[code]
+        move = (1 << start) | (1 << to)
+        self.bitboards[code] ^= move
+        self.occupied[piece.white] ^= move
+        self.zobrist ^= keys[start] ^ keys[to]
+
+        if captured is not None:
+            bit = 1 << to
+            self.bitboards[captured.code] ^= bit
+            self.occupied[captured.white] ^= bit
+            self.zobrist ^= ZOBRIST_KEYS[captured.code][to]
+            self.material -= SIGNED_PIECE_VALUES[captured.code]
+
+        squares[start] = None
+        squares[to] = piece
+        piece.cell = cell
+
+    def unmake_move(self):
+        """
+        Takes back the last move made with :py:meth:`make_move`, see :py:meth:`BoardBase.unmake_move <board.BoardBase.unmake_move>`
+        """
+        piece, origin, captured, zobrist, material = self.undo_stack.pop()
+
+        row, col = piece.cell
+        to = int(row) * 8 + int(col)
+        row, col = origin
+        start = int(row) * 8 + int(col)
+
+        move = (1 << start) | (1 << to)
+        self.bitboards[piece.code] ^= move
+        self.occupied[piece.white] ^= move
+
+        if captured is not None:
+            bit = 1 << to
+            self.bitboards[captured.code] ^= bit
+            self.occupied[captured.white] ^= bit
+
+        squares = self.squares
+        squares[start] = piece
+        squares[to] = captured
+        piece.cell = origin
+
+        self.zobrist = zobrist
+        self.material = material
+
+    def iterate_cells_with_pieces(self, white):
+        """
+        Yields all pieces of the given color, in the same (row by row) order as :py:class:`board.Board`
+        """
+        squares = self.squares
+        mask = self.occupied[white]
+        while mask:
+            lowest = mask & -mask
+            yield squares[lowest.bit_length() - 1]
+            mask ^= lowest
+
+    def find_king(self, white):
+        """
+        Returns the king of the given color or None if there is no King on the board.
+        Like :py:meth:`Board.find_king <board.Board.find_king>`, the first one (row by row) is returned if there are several.
+        """
+        kings = self.bitboards[KING if white else KING | BLACK]
+        if not kings:
+            return None
+        return self.squares[(kings & -kings).bit_length() - 1]
+
+    def generate_reachable_mask(self, piece):
+        """
+        Returns the mask of all cells the given piece can reach in its next move (ignoring checks)
+        """
+        row, col = piece.cell
+        square = row * 8 + col
+        own = self.occupied[piece.white]
+        other = self.occupied[not piece.white]
+        kind = piece.kind
+
+        if kind == PAWN:
+            empty = ~(own | other) & FULL
+            if piece.white:
+                single = ((1 << square) << 8) & empty
+                double = ((single & ROW_3) << 8) & empty
+            else:
+                single = ((1 << square) >> 8) & empty
+                double = ((single & ROW_6) >> 8) & empty
+            return single | double | (PAWN_ATTACKS[piece.white][square] & other)
+
+        if kind == KNIGHT:
+            attacks = KNIGHT_ATTACKS[square]
+        elif kind == KING:
+            attacks = KING_ATTACKS[square]
+        elif kind == ROOK:
+            attacks = sliding_attacks(square, own | other, ROOK_DIRECTIONS)
+        elif kind == BISHOP:
+            attacks = sliding_attacks(square, own | other, BISHOP_DIRECTIONS)
+        else:
+            attacks = sliding_attacks(square, own | other, ROOK_DIRECTIONS) | sliding_attacks(square, own | other, BISHOP_DIRECTIONS)
+
+        return attacks & ~own
+
+    def generate_reachable_cells(self, piece):
+        """
+        Returns a list of all cells the given piece can reach in its next move (ignoring checks)
+        """
+        mask = self.generate_reachable_mask(piece)
+        cells = []
+        while mask:
+            lowest = mask & -mask
+            cells.append(CELLS[lowest.bit_length() - 1])
+            mask ^= lowest
+        return cells
+
+    def is_king_check(self, white):
+        """
+        Evaluates if the king of given color is currently in check by intersecting the attack masks
+        of the kings square with the opposing piece sets.
+        """
+        kings = self.bitboards[KING if white else KING | BLACK]
+        if not kings:
+            return False
+
+        # Like find_king, use the first king (row by row) if there are several
+        square = (kings & -kings).bit_length() - 1
+        enemy = BLACK if white else 0
+        bitboards = self.bitboards
+        occupied = self.occupied[True] | self.occupied[False]
+
+        return bool(
+            KNIGHT_ATTACKS[square] & bitboards[KNIGHT | enemy]
+            or KING_ATTACKS[square] & bitboards[KING | enemy]
+            or PAWN_ATTACKS[white][square] & bitboards[PAWN | enemy]
+            or sliding_attacks(square, occupied, ROOK_DIRECTIONS) & (bitboards[ROOK | enemy] | bitboards[QUEEN | enemy])
+            or sliding_attacks(square, occupied, BISHOP_DIRECTIONS) & (bitboards[BISHOP | enemy] | bitboards[QUEEN | enemy])
+        )
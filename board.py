@@ -1,8 +1,14 @@
 from operator import is_
 import os
+import random
 import numpy as np
 from uuid import uuid4
-from pieces import Pawn, Rook, Bishop, Queen, King, Knight
+import pieces
+from pieces import (
+    Pawn, Rook, Bishop, Queen, King, Knight, PAWN, ROOK, KNIGHT, BISHOP, QUEEN, KING,
+    ROOK_RAYS, BISHOP_RAYS, KNIGHT_JUMPS, KING_STEPS, PAWN_CAPTURES, SIGNED_PIECE_VALUES, CELLS,
+)
+from cache import LRUCache
 from util import (
     map_piece_to_character,
     InvalidColumnException,
@@ -10,19 +16,61 @@ from util import (
 )
 
 
+# Random 64 bit keys for every piece code (see pieces.py) on every cell, indexed as ZOBRIST_KEYS[code][row * 8 + col].
+# A fixed seed keeps the keys (and therefore all cache keys) identical between runs and processes.
+_zobrist_random = random.Random(0x5C4AC4)
+ZOBRIST_KEYS = [[_zobrist_random.getrandbits(64) for _ in range(64)] for _ in range(16)]
+
+# Number of positions whose legal moves are kept in the legal_move_cache
+LEGAL_MOVE_CACHE_SIZE = 10_000
+
+# Legal moves per position and side to move, shared by all boards (so the engine and the UI share it as well)
+legal_move_cache = LRUCache(LEGAL_MOVE_CACHE_SIZE)
+
+# Number of (position, color) results kept in the shared_check_cache (about 14 MB when full). Every process has its own
+# cache, so batch jobs with many processes may want less, long searches more: call shared_check_cache.resize(capacity)
+CHECK_CACHE_SIZE = 100_000
+
+# Results of is_king_check per position and color, shared by all boards that are not given their own cache
+shared_check_cache = LRUCache(CHECK_CACHE_SIZE)
+
+# Piece kind for every (upper case) piece character
+CHARACTER_KINDS = {"P": PAWN, "R": ROOK, "N": KNIGHT, "B": BISHOP, "Q": QUEEN, "K": KING}
+
+
 class BoardBase:
     """
     Base Class for the Chess Board.
     You are free to look around the members of this class and their implementation, however you will not need to change
     anything in this class for any of the tasks.
     """
+    # Classes used to create the pieces of every kind, alternative backends can provide their own subclasses
+    piece_classes = {PAWN: Pawn, ROOK: Rook, KNIGHT: Knight, BISHOP: Bishop, QUEEN: Queen, KING: King}
 
-    def __init__(self):
+    def __init__(self, check_cache=None):
         """Constructor.
         Start with empty cells
+
+        :param check_cache: :py:class:`LRUCache <cache.LRUCache>` for the results of :py:meth:`is_king_check_cached`,
+                            defaults to the shared_check_cache of all boards of this process
         """
         self.cells = [[None for _ in range(8)] for _ in range(8)]
-        self.check_cache = {}
+        self.check_cache = check_cache if check_cache is not None else shared_check_cache
+
+        # Zobrist key of the current configuration, maintained incrementally by set_cell
+        self.zobrist = 0
+
+        # Squares (row * 8 + col) of the kings per color, maintained by set_cell
+        self.king_squares = {True: set(), False: set()}
+
+        # Material balance from whites perspective, maintained by set_cell
+        self.material = 0
+
+        # Moves made with make_move, to be taken back by unmake_move
+        self.undo_stack = []
+
+        # Side to move as read from (or written to) a FEN string
+        self.white_to_move = True
 
     def __str__(self):
         """
@@ -68,15 +116,20 @@ class BoardBase:
         Clears to board, deleting all pieces currently placed on it
         """
         self.cells = [[None for _ in range(8)] for _ in range(8)]
+        self.zobrist = 0
+        self.king_squares = {True: set(), False: set()}
+        self.material = 0
+        self.undo_stack = []
 
 
     def load_from_memory(self, configString):
         """
-        Read previously stored configuration from a memory string
+        Read previously stored configuration from a memory string, white is to move
 
         :param name: Filename to use. 
         """       
-        self.cells = [[None for _ in range(8)] for _ in range(8)]
+        self.clear_board()
+        self.white_to_move = True
 
         for row, line in enumerate(configString.split("\n")):
               line = line.strip()
@@ -89,23 +142,122 @@ class BoardBase:
                 else:
                     white = False
 
-                pieceCode = pieceCode.upper()
-
-                if pieceCode == "P":
-                    piece = Pawn(self, white)
-                if pieceCode == "K":
-                    piece = King(self, white)
-                if pieceCode == "Q":
-                    piece = Queen(self, white)
-                if pieceCode == "N":
-                    piece = Knight(self, white)
-                if pieceCode == "B":
-                    piece = Bishop(self, white)
-                if pieceCode == "R":
-                    piece = Rook(self, white)
+                piece = self.create_piece(CHARACTER_KINDS[pieceCode.upper()], white)
 
                 self.set_cell(np.array([7-row, col]), piece)
 
+    def load_from_hash(self, hash):
+        """
+        Replaces the current configuration by the one given as :py:meth:`hash` string
+        (64 piece characters or '.', starting with row 8), white is to move
+
+        :param hash: The hash string of a board configuration
+        """
+        self.clear_board()
+        self.white_to_move = True
+
+        for index, pieceCode in enumerate(hash):
+            if pieceCode == '.':
+                continue
+
+            piece = self.create_piece(CHARACTER_KINDS[pieceCode.upper()], pieceCode.isupper())
+            self.set_cell(np.array([7 - index // 8, index % 8]), piece)
+
+    def copy(self):
+        """
+        Returns an independent copy of this board with its own piece objects.
+        """
+        other = type(self)()
+        other.load_from_hash(self.hash())
+        other.white_to_move = self.white_to_move
+        return other
+
+    def load_from_fen(self, fen):
+        """
+        Replaces the current configuration by the one given in Forsyth-Edwards Notation
+        (e.g. "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1").
+
+        The piece placement is read in a single pass and the pieces are put on the preallocated cells of pieces.CELLS.
+        Castling rights, en passant square and move counters are ignored as the engine doesn't use them.
+
+        :param fen: The FEN string, only the piece placement is required
+        :return: True if white is to move (also stored in white_to_move)
+        :raises ValueError: If the piece placement is invalid
+        """
+        fields = fen.split()
+        if not fields:
+            raise ValueError(f"Invalid FEN: {fen!r}")
+
+        self.clear_board()
+
+        row, col = 7, 0
+        for character in fields[0]:
+            if character == '/':
+                if col != 8 or row == 0:
+                    raise ValueError(f"Invalid FEN: {fen!r}")
+                row -= 1
+                col = 0
+            elif character in "12345678":
+                col += ord(character) - ord('0')
+            else:
+                kind = CHARACTER_KINDS.get(character.upper())
+                if kind is None or col >= 8:
+                    raise ValueError(f"Invalid FEN: {fen!r}")
+
+                # The board was cleared, so the piece can go directly onto the square without the checks of set_cell
+                square = row * 8 + col
+                piece = self.create_piece(kind, character.isupper())
+                piece.cell = CELLS[square]
+                self._replace_piece(square, None, piece)
+                col += 1
+
+            if col > 8:
+                raise ValueError(f"Invalid FEN: {fen!r}")
+
+        if row != 0 or col != 8:
+            raise ValueError(f"Invalid FEN: {fen!r}")
+
+        if len(fields) > 1 and fields[1] not in ("w", "b"):
+            raise ValueError(f"Invalid FEN: {fen!r}")
+
+        self.white_to_move = len(fields) < 2 or fields[1] == "w"
+        return self.white_to_move
+
+    def to_fen(self, white_to_move=None):
+        """
+        Returns the current configuration in Forsyth-Edwards Notation.
+        There are no castling rights or en passant squares as the engine doesn't support them.
+
+        :param white_to_move: Side to move, defaults to white_to_move of this board
+        """
+        if white_to_move is None:
+            white_to_move = self.white_to_move
+
+        hash = self.hash()
+        rows = []
+        for start in range(0, 64, 8):
+            row = ""
+            empty = 0
+            for character in hash[start:start + 8]:
+                if character == '.':
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += character
+            if empty:
+                row += str(empty)
+            rows.append(row)
+
+        return "/".join(rows) + (" w" if white_to_move else " b") + " - - 0 1"
+
+    def create_piece(self, kind, white):
+        """
+        Creates a new piece of the given kind (see pieces.py) and color for this board. It is not placed yet.
+        """
+        return self.piece_classes[kind](self, white)
+
     def load_from_disk(self, fname):
         """
         Read previously stored configuration from disk
@@ -117,20 +269,41 @@ class BoardBase:
             self.load_from_memory(f.read())
             
 
+    def get_valid_moves(self, white):
+        """
+        Returns the valid cells of all pieces of the given color, as dictionary from the square (row * 8 + col)
+        of each piece to the list returned by its :py:meth:`get_valid_cells <pieces.Piece.get_valid_cells>`.
+
+        The result is kept in the legal_move_cache, keyed by the zobrist key and the color. So once the moves of a
+        position are known (e.g. because the engine generated them), asking again costs a dictionary lookup.
+        The backends generate the cells in different orders, so the class of the board is part of the key as well.
+        The returned dictionary is shared with the cache and must not be modified.
+        """
+        key = ((self.zobrist << 1) | white, type(self))
+        moves = legal_move_cache.get(key)
+        if moves is None:
+            moves = {}
+            for piece in self.iterate_cells_with_pieces(white):
+                row, col = piece.cell
+                moves[int(row) * 8 + int(col)] = piece.get_valid_cells()
+            legal_move_cache.put(key, moves)
+
+        return moves
+
     def is_king_check_cached(self, white):
         """
         Calls is_king_check for board configurations not yet known. Caches the result for later look-up.
+        The cache is bounded, so the least recently used results are evicted once it is full.
         """
-        # Calculate hash and see if current position is in the cache
-        hash = self.hash() + ("-w" if white else "-b")
-        if hash in self.check_cache:
-            return self.check_cache[hash]
+        # Combine the zobrist key with the color and see if current position is in the cache
+        hash = (self.zobrist << 1) | white
+        value = self.check_cache.get(hash)
+        if value is not None:
+            return value
 
-        # No, so evaluate it
+        # No, so evaluate it and cache it for later
         value = self.is_king_check(white)
-
-        # Cache it for later
-        self.check_cache[hash] = value
+        self.check_cache.put(hash, value)
         return value
 
     def get_cell(self, cell):
@@ -147,6 +320,14 @@ class BoardBase:
         # Return the piece on the cell
         return self.cells[row][col]
 
+    def get_cell_unchecked(self, cell):
+        """
+        Retrieves the piece placed on the given cell like get_cell, but skips the validity check.
+        Only use it for cells known to be on the board, e.g. from the precomputed tables in pieces.py
+        """
+        row, col = cell
+        return self.cells[row][col]
+
     def set_cell(self, cell, piece):
         """
         Places a piece on a given cell.
@@ -171,45 +352,97 @@ class BoardBase:
             piece.cell = np.array([row, col])
 
         # Update the cell on the board
-        self.cells[row][col] = piece
+        self._replace_piece(int(row) * 8 + int(col), self.cells[row][col], piece)
+
+    def _replace_piece(self, square, old_piece, piece):
+        """
+        Replaces old_piece (or None) on the given square (row * 8 + col) by piece (or None).
+        Keeps the zobrist key, king squares and material in sync, but does not touch the cells of the pieces.
+        """
+        if old_piece is not None:
+            self.zobrist ^= ZOBRIST_KEYS[old_piece.code][square]
+            self.material -= SIGNED_PIECE_VALUES[old_piece.code]
+            if old_piece.kind == KING:
+                self.king_squares[old_piece.white].discard(square)
+        if piece is not None:
+            self.zobrist ^= ZOBRIST_KEYS[piece.code][square]
+            self.material += SIGNED_PIECE_VALUES[piece.code]
+            if piece.kind == KING:
+                self.king_squares[piece.white].add(square)
+
+        self.cells[square >> 3][square & 7] = piece
+
+    def make_move(self, piece, cell):
+        """
+        Moves the piece to the given cell, hitting any piece placed there.
+        The move is recorded on the undo stack, so it can be taken back with :py:meth:`unmake_move`.
+
+        Other than set_cell, this does not check the cell and does not allocate a new cell for the piece,
+        the given cell has to be on the board (e.g. taken from get_valid_cells).
+        """
+        row, col = cell
+        captured = self.get_cell_unchecked(cell)
+        self.undo_stack.append((piece, piece.cell, captured, self.zobrist, self.material))
+
+        origin_row, origin_col = piece.cell
+        self._replace_piece(int(origin_row) * 8 + int(origin_col), piece, None)
+        self._replace_piece(int(row) * 8 + int(col), captured, piece)
+        piece.cell = cell
+
+    def unmake_move(self):
+        """
+        Takes back the last move made with :py:meth:`make_move`, placing a hit piece back on its cell
+        and restoring the zobrist key and material of the position before the move.
+        """
+        piece, origin, captured, zobrist, material = self.undo_stack.pop()
+
+        row, col = piece.cell
+        self._replace_piece(int(row) * 8 + int(col), piece, captured)
+        row, col = origin
+        self._replace_piece(int(row) * 8 + int(col), None, piece)
+        piece.cell = origin
+
+        self.zobrist = zobrist
+        self.material = material
 
     def reset(self):
         """
         Resets the board to its default (start) configuration
         """
         # Start with all empty cells
-        self.cells = [[None for _ in range(8)] for _ in range(8)]
+        self.clear_board()
+        self.white_to_move = True
 
         # Pawns
         for col in range(8):
-            self.set_cell(np.array([1, col]), Pawn(self, True))
-            self.set_cell(np.array([6, col]), Pawn(self, False))
+            self.set_cell(np.array([1, col]), self.create_piece(PAWN, True))
+            self.set_cell(np.array([6, col]), self.create_piece(PAWN, False))
 
         # Rooks
-        self.set_cell(np.array([0, 0]), Rook(self, True))
-        self.set_cell(np.array([0, 7]), Rook(self, True))
-        self.set_cell(np.array([7, 0]), Rook(self, False))
-        self.set_cell(np.array([7, 7]), Rook(self, False))
+        self.set_cell(np.array([0, 0]), self.create_piece(ROOK, True))
+        self.set_cell(np.array([0, 7]), self.create_piece(ROOK, True))
+        self.set_cell(np.array([7, 0]), self.create_piece(ROOK, False))
+        self.set_cell(np.array([7, 7]), self.create_piece(ROOK, False))
 
         # Knights
-        self.set_cell(np.array([0, 1]), Knight(self, True))
-        self.set_cell(np.array([0, 6]), Knight(self, True))
-        self.set_cell(np.array([7, 1]), Knight(self, False))
-        self.set_cell(np.array([7, 6]), Knight(self, False))
+        self.set_cell(np.array([0, 1]), self.create_piece(KNIGHT, True))
+        self.set_cell(np.array([0, 6]), self.create_piece(KNIGHT, True))
+        self.set_cell(np.array([7, 1]), self.create_piece(KNIGHT, False))
+        self.set_cell(np.array([7, 6]), self.create_piece(KNIGHT, False))
 
         # Bishops
-        self.set_cell(np.array([0, 2]), Bishop(self, True))
-        self.set_cell(np.array([0, 5]), Bishop(self, True))
-        self.set_cell(np.array([7, 2]), Bishop(self, False))
-        self.set_cell(np.array([7, 5]), Bishop(self, False))
+        self.set_cell(np.array([0, 2]), self.create_piece(BISHOP, True))
+        self.set_cell(np.array([0, 5]), self.create_piece(BISHOP, True))
+        self.set_cell(np.array([7, 2]), self.create_piece(BISHOP, False))
+        self.set_cell(np.array([7, 5]), self.create_piece(BISHOP, False))
 
         # Queen
-        self.set_cell(np.array([0, 3]), Queen(self, True))
-        self.set_cell(np.array([7, 3]), Queen(self, False))
+        self.set_cell(np.array([0, 3]), self.create_piece(QUEEN, True))
+        self.set_cell(np.array([7, 3]), self.create_piece(QUEEN, False))
 
         # King
-        self.set_cell(np.array([0, 4]), King(self, True))
-        self.set_cell(np.array([7, 4]), King(self, False))
+        self.set_cell(np.array([0, 4]), self.create_piece(KING, True))
+        self.set_cell(np.array([7, 4]), self.create_piece(KING, False))
 
         #self.save_to_disk()
 
@@ -221,12 +454,13 @@ class Board(BoardBase):
     **HINT**: Read the documentation carefully. Also look at the parent class (BoardBase) for further reference and example implementations. 
     """
 
-    def __init__(self):
+    def __init__(self, check_cache=None):
         """
         Constructor, currently does nothing but calling the super constructor. 
 
+        :param check_cache: See :py:class:`BoardBase`
         """
-        super().__init__()
+        super().__init__(check_cache)
 
     def iterate_cells_with_pieces(self, white):
 
@@ -271,10 +505,14 @@ class Board(BoardBase):
         # TODO: Implement
         # Alestair
 
-        for piece in self.iterate_cells_with_pieces(white):     # itterieren über alle Figuren
-            if isinstance(piece,King):                          # wenn Figur = König return König, ansonsten None
-                return piece
-        return None
+        # set_cell keeps track of the kings squares, so there is no need to scan the board.
+        # If there are several kings, the first one (row by row) is returned.
+        king_squares = self.king_squares[white]
+        if not king_squares:
+            return None
+
+        row, col = divmod(min(king_squares), 8)
+        return self.cells[row][col]
 
     def is_king_check(self, white):
         """
@@ -288,13 +526,33 @@ class Board(BoardBase):
         """
         # TODO: Implement
         # Alestair
-        king = self.find_king(white)                
-        if king:
-            enemies = [piece for piece in self.iterate_cells_with_pieces(not white)]    # Liste mit allen geg. Figuren
-            for enemy in enemies:                                                       # Durch Liste mit allen Gegnern itterieren
-                if tuple(king.cell) in enemy.get_reachable_cells():                     # Wenn König in reachable_cells der geg. Figur
-                    return True                                                         # return True, sonst False
-            
+        king = self.find_king(white)
+        if king is None:
+            return False
+
+        # Instead of generating the moves of every opposing piece, look outwards from the kings cell.
+        # The king is attacked if the first piece along a ray is an opposing slider of the matching kind...
+        row, col = king.cell
+        square = row * 8 + col
+        for rays, sliders in ((ROOK_RAYS, (ROOK, QUEEN)), (BISHOP_RAYS, (BISHOP, QUEEN))):
+            for ray in rays[square]:
+                for cell in ray:
+                    piece = self.get_cell_unchecked(cell)
+                    if piece is None:
+                        continue
+
+                    if piece.white != white and piece.kind in sliders:
+                        return True
+                    break
+
+        # ... or if an opposing knight, king or pawn is placed a single step away.
+        # The opposing pawns attack from the cells a pawn of the kings color could hit on.
+        for cells, kind in ((KNIGHT_JUMPS, KNIGHT), (KING_STEPS, KING), (PAWN_CAPTURES[white], PAWN)):
+            for cell in cells[square]:
+                piece = self.get_cell_unchecked(cell)
+                if piece is not None and piece.white != white and piece.kind == kind:
+                    return True
+
         return False
 
     def evaluate(self):
@@ -310,6 +568,10 @@ class Board(BoardBase):
         # TODO: Implement 
         # Alestair
 
+        # In the standard mode a pieces evaluation is its material value, which set_cell sums up incrementally
+        if pieces.EVALUATION_MODE is None:
+            return float(self.material)
+
         score = 0.0                                         # Starting score
 
         for piece in self.iterate_cells_with_pieces(True):  # score + alle Werte von weiß
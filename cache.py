@@ -0,0 +1,71 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A dictionary with a fixed capacity. Once it is full, storing a new entry evicts the least recently used one.
+
+    There are no locks: every single operation on the underlying OrderedDict is atomic, so threads (e.g. the UI
+    and the engine worker) can share a cache. Concurrent use can at worst make the order of eviction slightly inexact.
+    """
+
+    def __init__(self, capacity):
+        """
+        Constructor
+
+        :param capacity: Maximum number of entries
+        """
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored for the given key (marking it as recently used) or default if there is none
+        """
+        try:
+            value = self.entries[key]
+            self.entries.move_to_end(key)
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Stores the value for the given key, evicting the least recently used entries beyond the capacity
+        """
+        entries = self.entries
+        entries[key] = value
+        entries.move_to_end(key)
+
+        while len(entries) > self.capacity:
+            try:
+                entries.popitem(last=False)
+            except KeyError:
+                break
+
+    def resize(self, capacity):
+        """
+        Changes the capacity, evicting the least recently used entries if there are too many
+        """
+        self.capacity = capacity
+        while len(self.entries) > capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes all entries and resets the statistics
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,219 @@
+from board import Board, ZOBRIST_KEYS
+from pieces import (
+    PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, BLACK, SIGNED_PIECE_VALUES, CELLS,
+    ROOK_RAYS as PIECE_ROOK_RAYS, BISHOP_RAYS as PIECE_BISHOP_RAYS, KNIGHT_JUMPS, KING_STEPS, PAWN_CAPTURES,
+)
+from util import InvalidColumnException, InvalidRowException
+
+# Character for every piece code as used by BoardBase.hash()
+CODE_CHARACTERS = ["."] * 16
+for _kind, _character in ((PAWN, "P"), (KNIGHT, "N"), (BISHOP, "B"), (ROOK, "R"), (QUEEN, "Q"), (KING, "K")):
+    CODE_CHARACTERS[_kind] = _character
+    CODE_CHARACTERS[_kind | BLACK] = _character.lower()
+
+
+def _to_squares(cells):
+    """
+    Converts a precomputed list of cells from pieces.py into a list of squares (row * 8 + col)
+    """
+    return [row * 8 + col for row, col in cells]
+
+
+# The movement tables of pieces.py in terms of squares
+ROOK_RAYS = [[_to_squares(ray) for ray in rays] for rays in PIECE_ROOK_RAYS]
+BISHOP_RAYS = [[_to_squares(ray) for ray in rays] for rays in PIECE_BISHOP_RAYS]
+KNIGHT_SQUARES = [_to_squares(cells) for cells in KNIGHT_JUMPS]
+KING_SQUARES = [_to_squares(cells) for cells in KING_STEPS]
+
+# Squares an opposing pawn has to stand on to attack the given square, indexed by the color of the attacked side.
+# Black pawns move towards row 0, so they attack a white king from the row above and vice versa.
+# These are exactly the squares a pawn of the attacked color could hit from the given square.
+PAWN_ATTACKERS = {white: [_to_squares(cells) for cells in PAWN_CAPTURES[white]] for white in (True, False)}
+
+
+class CompactBoard(Board):
+    """
+    Alternative board backend storing the configuration in a flat 64 entry bytearray of piece codes
+    (see pieces.py) alongside a list of the piece objects per square and the occupied squares per color.
+
+    Pieces are placed on preallocated cell tuples, so moving a piece does not allocate anything. The king check
+    is answered from the piece codes alone and a copy of the board is a copy of the code buffer.
+    It implements the same API as :py:class:`board.Board`, so pieces and the engine can use it as a drop-in replacement.
+    """
+
+    def __init__(self, check_cache=None):
+        """
+        Constructor, starts with an empty board (assigning the cells in the super constructor clears the board)
+
+        :param check_cache: See :py:class:`board.BoardBase`
+        """
+        super().__init__(check_cache)
+
+    @property
+    def cells(self):
+        """
+        8x8 view (rows of columns) of the pieces on the board, as used by :py:class:`board.BoardBase`
+        """
+        return [self.squares[row * 8:row * 8 + 8] for row in range(8)]
+
+    @cells.setter
+    def cells(self, cells):
+        """
+        Replaces the current configuration by the given 8x8 rows of pieces (or None)
+        """
+        self.clear_board()
+        for row, pieces in enumerate(cells):
+            for col, piece in enumerate(pieces):
+                if piece is not None:
+                    piece.cell = None
+                    self.set_cell(CELLS[row * 8 + col], piece)
+
+    def clear_board(self):
+        """
+        Clears to board, deleting all pieces currently placed on it
+        """
+        self.codes = bytearray(64)
+        self.squares = [None] * 64
+        self.piece_squares = {True: set(), False: set()}
+        self.king_squares = {True: set(), False: set()}
+        self.zobrist = 0
+        self.material = 0
+        self.undo_stack = []
+
+    def hash(self):
+        """
+        Returns a unique hash (string) representation for the current board configuration,
+        identical to :py:meth:`BoardBase.hash <board.BoardBase.hash>`
+        """
+        return "".join(CODE_CHARACTERS[code] for row in range(7, -1, -1) for code in self.codes[row * 8:row * 8 + 8])
+
+    def copy(self):
+        """
+        Returns an independent copy of this board with its own piece objects.
+        """
+        other = type(self)()
+        other.load_from_codes(self.codes)
+        other.white_to_move = self.white_to_move
+        return other
+
+    def load_from_codes(self, codes):
+        """
+        Replaces the current configuration by the given 64 piece codes (square row * 8 + col)
+        """
+        self.clear_board()
+        for square, code in enumerate(codes):
+            if code:
+                piece = self.create_piece(code & ~BLACK, not code & BLACK)
+                self.set_cell(CELLS[square], piece)
+
+    def get_cell(self, cell):
+        """
+        Retrieves the piece placed on the given cell or "None" if cell is invalid
+        """
+        if not self.is_valid_cell(cell):
+            return None
+
+        row, col = cell
+        return self.squares[row * 8 + col]
+
+    def get_cell_unchecked(self, cell):
+        """
+        Retrieves the piece placed on the given cell like get_cell, but skips the validity check.
+        """
+        row, col = cell
+        return self.squares[row * 8 + col]
+
+    def set_cell(self, cell, piece):
+        """
+        Places a piece on a given cell.
+        """
+        row, col = cell
+
+        # Check if they are valid, raise an Exception if not
+        if row < 0 or row >= 8:
+            raise InvalidRowException((row, col))
+
+        if col < 0 or col >= 8:
+            raise InvalidColumnException((row, col))
+
+        square = int(row) * 8 + int(col)
+
+        # If the piece has a cell (so it was placed on the board already), set that cell to None
+        if piece is not None:
+            if piece.cell is not None:
+                self.set_cell(piece.cell, None)
+            piece.cell = CELLS[square]
+
+        self._replace_piece(square, self.squares[square], piece)
+
+    def _replace_piece(self, square, old_piece, piece):
+        """
+        Updates the codes, piece lists, zobrist key and material when old_piece (or None) on the given square is replaced by piece (or None).
+        """
+        # Remove the piece currently placed on the square
+        if old_piece is not None:
+            self.zobrist ^= ZOBRIST_KEYS[old_piece.code][square]
+            self.material -= SIGNED_PIECE_VALUES[old_piece.code]
+            self.piece_squares[old_piece.white].discard(square)
+            self.king_squares[old_piece.white].discard(square)
+
+        # Place the new one
+        if piece is not None:
+            self.zobrist ^= ZOBRIST_KEYS[piece.code][square]
+            self.material += SIGNED_PIECE_VALUES[piece.code]
+            self.piece_squares[piece.white].add(square)
+            if piece.kind == KING:
+                self.king_squares[piece.white].add(square)
+            self.codes[square] = piece.code
+        else:
+            self.codes[square] = 0
+
+        self.squares[square] = piece
+
+    def iterate_cells_with_pieces(self, white):
+        """
+        Yields all pieces of the given color, in the same (row by row) order as :py:class:`board.Board`
+        """
+        for square in sorted(self.piece_squares[white]):
+            yield self.squares[square]
+
+    def find_king(self, white):
+        """
+        Returns the king of the given color or None if there is no King on the board.
+        Like :py:meth:`Board.find_king <board.Board.find_king>`, the first one (row by row) is returned if there are several.
+        """
+        king_squares = self.king_squares[white]
+        if not king_squares:
+            return None
+        return self.squares[min(king_squares)]
+
+    def is_king_check(self, white):
+        """
+        Evaluates if the king of given color is currently in check.
+
+        Instead of generating the moves of all opposing pieces, this looks outwards from the kings square
+        and checks whether a matching opposing piece sits at the end of a ray or a knight, king or pawn step.
+        """
+        king_squares = self.king_squares[white]
+        if not king_squares:
+            return False
+
+        square = min(king_squares)
+        codes = self.codes
+        enemy = BLACK if white else 0
+
+        for rays, sliders in ((ROOK_RAYS, (ROOK | enemy, QUEEN | enemy)), (BISHOP_RAYS, (BISHOP | enemy, QUEEN | enemy))):
+            for ray in rays[square]:
+                for target in ray:
+                    code = codes[target]
+                    if code:
+                        if code in sliders:
+                            return True
+                        break
+
+        for steps, attacker in ((KNIGHT_SQUARES, KNIGHT | enemy), (KING_SQUARES, KING | enemy), (PAWN_ATTACKERS[white], PAWN | enemy)):
+            for target in steps[square]:
+                if codes[target] == attacker:
+                    return True
+
+        return False
@@ -1,10 +1,75 @@
+import copy
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
 from tqdm import tqdm
 from util import map_piece_to_character, cell_to_string
+from pieces import PIECE_VALUES
+from transposition import TranspositionTable, SharedTranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
 
 
-DEPTH = 3
-RANDOM_MOVE_CHANCE = 10  # Adjust Random Move Chance (0-100)
+MAX_ITERATIVE_DEPTH = 32  # Upper limit for the iterative deepening search
+QUIESCENCE_DEPTH = 8  # Maximum number of captures the quiescence search follows
+DELTA_MARGIN = 200  # Safety margin of the delta pruning in the quiescence search
+QUIESCENCE_KEY = 0x6A09E667F3BCC908  # Mixed into the eval_cache key of searches with quiescence, they score differently
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search once the deadline of the current search is exceeded.
+    """
+    pass
+
+
+class EngineConfig:
+    """
+    Settings of the chess engine.
+
+    The engine adds a small random variation to every evaluated move and sometimes picks one of the top three moves
+    at the root, so it does not play the same game over and over. All random numbers are drawn from the own generator
+    of the configuration, so a search can be repeated by using the same seed. In deterministic mode there is
+    no randomness at all and identical positions always give identical results (with the same eval_cache contents).
+    """
+    def __init__(self, depth=3, random_move_chance=10, seed=None, deterministic=False, workers=1, lazy_smp=False,
+                 move_ordering=True, history_beam=False, quiescence=False):
+        """
+        Initializes the class using the provided parameters
+
+        :param depth: Search depth of the mini-max search
+        :param random_move_chance: Chance (0-100) to pick a random move out of the top three at the root
+        :param seed: Seed of the random number generator, None seeds it from the system
+        :param deterministic: Disable all randomness of the search
+        :param workers: Number of processes searching the root moves, 1 searches in this process
+        :param lazy_smp: Let all workers search the whole tree with a shared transposition table
+            (see :py:func:`lazy_smp_search`) instead of splitting the root moves between them
+        :param move_ordering: Let the alpha-beta search try captures, killer moves and moves with a good history first
+            (see :py:func:`order_moves`)
+        :param history_beam: Break ties between equally evaluated moves by the history table when cutting the beam of
+            :py:func:`evaluate_all_possible_moves`, instead of keeping the moves generated first
+        :param quiescence: Follow the captures after the last move of the search with :py:func:`quiescence`
+            instead of taking the static evaluation
+        """
+        self.depth = depth
+        self.random_move_chance = random_move_chance
+        self.seed = seed
+        self.deterministic = deterministic
+        self.workers = workers
+        self.lazy_smp = lazy_smp
+        self.move_ordering = move_ordering
+        self.history_beam = history_beam
+        self.quiescence = quiescence
+        self.rng = random.Random(seed)
+
+    def reseed(self):
+        """
+        Restarts the random number generator with the configured seed
+        """
+        self.rng.seed(self.seed)
+
+
+# Configuration used if no other one is given
+DEFAULT_CONFIG = EngineConfig()
+
 
 class MinMaxArg:
     """ Helper Class for the MinMax Algorithm.
@@ -12,18 +77,28 @@ class MinMaxArg:
 
     Note: You don´t need to implement anything in this case, you can use it in the MinMax Algorithm as you seem fit. 
     """
-    def __init__(self, depth=DEPTH, playAsWhite=True):
+    def __init__(self, depth=None, playAsWhite=True, deadline=None, config=None, stop=None, ply=0):
         """
         Initializes the class using the provided parameters
+
+        :param depth: Remaining search depth, defaults to the depth of the configuration
+        :param deadline: Optional point in time (see time.perf_counter) at which the search has to stop
+        :param config: The :py:class:`EngineConfig` of this search, defaults to DEFAULT_CONFIG
+        :param stop: Optional function, the search stops as soon as it returns True
+        :param ply: Number of moves made since the start of the search
         """
-        self.depth = depth
+        self.config = config if config is not None else DEFAULT_CONFIG
+        self.depth = depth if depth is not None else self.config.depth
         self.playAsWhite = playAsWhite
+        self.deadline = deadline
+        self.stop = stop
+        self.ply = ply
 
     def next(self):
         """ 
         Provides the next stage of the MinMax Algorithm by reducing the depth by one and toggling playAsWhite
         """
-        return MinMaxArg(self.depth - 1, not self.playAsWhite)
+        return MinMaxArg(self.depth - 1, not self.playAsWhite, self.deadline, self.config, self.stop, self.ply + 1)
 
 
 class Move:
@@ -59,6 +134,17 @@ class Move:
         return s
 
 
+def _check_interrupt(minMaxArg):
+    """
+    Raises SearchTimeout if minMaxArg.deadline has passed or minMaxArg.stop returns True
+    """
+    if minMaxArg.deadline is not None and time.perf_counter() > minMaxArg.deadline:
+        raise SearchTimeout()
+
+    if minMaxArg.stop is not None and minMaxArg.stop():
+        raise SearchTimeout()
+
+
 def evaluate_all_possible_moves(board, minMaxArg: MinMaxArg, maximumNumberOfMoves: int = 10) -> list[Move] | None:
     """
     **TODO**:
@@ -70,15 +156,13 @@ def evaluate_all_possible_moves(board, minMaxArg: MinMaxArg, maximumNumberOfMove
     Iterate over all cells with pieces on them by calling the :py:meth:`iterate_cells_with_pieces <board.Board.iterate_cells_with_pieces>` method. 
     For each piece, retrieve all valid moves by calling the :py:meth:`get_valid_cells <pieces.Piece.get_valid_cells>` method of that piece. 
 
-    In order to evaluate a valid move, first you need to place that piece on the respective cell. Call the :py:meth:`set_cell <board.BoardBase.set_cell>` method 
-    to do so. Before doing so, remember the cell the piece is currently placed on as you will need to place it back later.
-    Because placing a piece on a new cell could potential hit (and thus remove) an opposing piece currently placed on this cell, 
-    you need to remember the piece on the target cell as well. Call :py:meth:`get_cell <board.BoardBase.get_cell>` to retrieve that piece and store it in a variable.
+    In order to evaluate a valid move, first you need to place that piece on the respective cell. Call the :py:meth:`make_move <board.BoardBase.make_move>` method 
+    to do so. It remembers the cell the piece is currently placed on and any opposing piece hit on the target cell, so the move can be taken back later.
 
     After the new board configuration is set in place, call the :py:meth:`evaluate <board.Board.evaluate>` method. You can use the 
     :py:class:`Move` class to store the move (piece and target cell) alongside its achieved evaluation score in a list. 
 
-    Restore the original board configuration by placing the piece in its original cell and restoring any potentially removed piece before 
+    Restore the original board configuration by calling :py:meth:`unmake_move <board.BoardBase.unmake_move>` before 
     moving on to the next move or piece. 
 
     Remember the :py:meth:`evaluate <board.Board.evaluate>` method always evaluates from WHITEs perspective, so a higher evaluation
@@ -99,31 +183,37 @@ def evaluate_all_possible_moves(board, minMaxArg: MinMaxArg, maximumNumberOfMove
     all_possible_moves = []
     pieces = board.iterate_cells_with_pieces(minMaxArg.playAsWhite)
 
-    # Iterate over every piece, get all its valid cells and save that piece's old position
+    # The valid cells of all pieces, usually already known from an earlier visit of this position
+    valid_moves = board.get_valid_moves(minMaxArg.playAsWhite)
+
+    # Iterate over every piece and get all its valid cells
     for piece in pieces:
-        valid_cells = piece.get_valid_cells()
-        old_pos = piece.cell
+        row, col = piece.cell
+        valid_cells = valid_moves[int(row) * 8 + int(col)]
 
-        # Iterate over every valid position and store the piece on that position (or 'None')
+        # Iterate over every valid position
         for temp_pos in valid_cells:
-            stored_piece = board.get_cell(temp_pos)
-
             # Change the board configuration to the new position and evaluate the board
-            board.set_cell(temp_pos, piece)
+            board.make_move(piece, temp_pos)
             all_possible_moves.append(Move(piece, temp_pos, board.evaluate()))
 
             # Return the board to its original state
-            board.set_cell(old_pos, piece)
-
-            if stored_piece:
-                board.set_cell(temp_pos, stored_piece)
+            board.unmake_move()
 
     # Add slight variation to the scores to accommodate for the case of multiple moves having the same score
-    for move in all_possible_moves:
-        move.score += random.uniform(0.0, 0.5)
+    config = minMaxArg.config
+    if not config.deterministic:
+        for move in all_possible_moves:
+            move.score += config.rng.uniform(0.0, 0.5)
 
     # Sort all moves in ascending/descending order depending on (minMaxArg.playAsWhite)
-    all_possible_moves.sort(key=lambda move: move.score, reverse=minMaxArg.playAsWhite)
+    if config.history_beam:
+        # Among equally evaluated moves, keep the ones with the best history
+        history = history_table[minMaxArg.playAsWhite]
+        sign = 1 if minMaxArg.playAsWhite else -1
+        all_possible_moves.sort(key=lambda move: (move.score, sign * history[_move_index(move)]), reverse=minMaxArg.playAsWhite)
+    else:
+        all_possible_moves.sort(key=lambda move: move.score, reverse=minMaxArg.playAsWhite)
 
     return all_possible_moves[:maximumNumberOfMoves]
 
@@ -156,11 +246,8 @@ def minMax(board, minMaxArg: MinMaxArg) -> Move:
 
     If the remaining search depth is greater than 1 (minMaxArg.depth > 1),
     iterate over all possible moves. Implement each move by placing the piece in question on the respective cell. 
-    Call the :py:meth:`set_cell <board.BoardBase.set_cell>` method 
-    to do so. Before doing so, remember the cell the piece is currently placed on as you will need to place it back later.
-    Because placing a piece on a new cell could potential hit (and thus remove) an opposing piece currently placed on this cell, 
-    you need to remember the piece on the target cell as well. Call :py:meth:`get_cell <board.BoardBase.get_cell>` 
-    to retrieve that piece and store it in a variable.
+    Call the :py:meth:`make_move <board.BoardBase.make_move>` method 
+    to do so. It records the move (including any hit piece) on the undo stack of the board.
 
     After the new board configuration is set in place, 
     call the :py:meth:`minMax_cached <engine.minMax_cached>` method
@@ -168,7 +255,7 @@ def minMax(board, minMaxArg: MinMaxArg) -> Move:
 
     Overwrite the current moves score with the result from the recursive call.
     
-    Restore the original board configuration by placing the piece in its original cell and restoring any potentially removed piece before 
+    Restore the original board configuration by calling :py:meth:`unmake_move <board.BoardBase.unmake_move>` before 
     moving on to the next move. 
 
     After all moves and their counter-moves have been evaluated sort the list
@@ -193,37 +280,49 @@ def minMax(board, minMaxArg: MinMaxArg) -> Move:
     :type minMaxArg: :py:class:`MinMaxArg`
     :return: Return the best move to make in the current situation.
     :rtype: :py:class:`Move`
+    :raises SearchTimeout: If minMaxArg.deadline has passed or minMaxArg.stop returns True.
+        The board is restored before the exception leaves this method.
     """
     # TODO: Implement the Mini-Max algorithm
+    global total_nodes
+    total_nodes += 1
+
+    _check_interrupt(minMaxArg)
+
     # Save a list of top 10 Moves
     possible_moves = evaluate_all_possible_moves(board, minMaxArg)
 
 
     if possible_moves:
-        if minMaxArg.depth > 1:
-
-            # Iterate over every possible move, store the piece on that moves' cell (or None) and the old position
+        if minMaxArg.depth <= 1 and minMaxArg.config.quiescence:
+            # Settle the captures after every move instead of trusting the static evaluation
             for move in possible_moves:
-                old_pos = move.piece.cell
-                piece_on_move_pos = board.get_cell(move.cell)
+                board.make_move(move.piece, move.cell)
+                move.score = quiescence(board, not minMaxArg.playAsWhite)
+                board.unmake_move()
 
-                # Change the board configuration to the new position
-                board.set_cell(move.cell, move.piece)
+            possible_moves.sort(key=lambda move: move.score, reverse=minMaxArg.playAsWhite)
 
-                # Save a new score of a future board configuration to this move
-                move.score = minMax_cached(board, minMaxArg.next()).score
+        elif minMaxArg.depth > 1:
 
-                # Return the board to its original state
-                board.set_cell(old_pos, move.piece)
+            # Iterate over every possible move
+            for move in possible_moves:
+                # Change the board configuration to the new position
+                board.make_move(move.piece, move.cell)
 
-                if piece_on_move_pos:
-                    board.set_cell(move.cell, piece_on_move_pos)
+                try:
+                    # Save a new score of a future board configuration to this move
+                    move.score = minMax_cached(board, minMaxArg.next()).score
+                finally:
+                    # Return the board to its original state, even if the search was interrupted
+                    board.unmake_move()
 
             # Choose a random move out of the top three after recursion has returned to its initial function call
-            if minMaxArg.depth == DEPTH:
-                if random.randint(1, 100) <= RANDOM_MOVE_CHANCE:
+            config = minMaxArg.config
+            if minMaxArg.depth == config.depth and not config.deterministic:
+                if config.rng.randint(1, 100) <= config.random_move_chance:
                     top_three_moves = possible_moves[:3]
-                    random.shuffle(top_three_moves)
+                    config.rng.shuffle(top_three_moves)
                     print("-" * 30, "Move was randomized.", "-" * 30, sep="\n")
 
                     # Return a random Move out of the top three
@@ -239,7 +338,556 @@ def minMax(board, minMaxArg: MinMaxArg) -> Move:
     return Move(None, (None, None), score=-1_000_000 if minMaxArg.playAsWhite else 1_000_000)
 
 
-def suggest_random_move(board):
+def quiescence(board, playAsWhite: bool, alpha: float = float("-inf"), beta: float = float("inf"), depth: int = QUIESCENCE_DEPTH) -> float:
+    """
+    Capture-only search at the leaves of the mini-max search, so positions in the middle of an exchange
+    are not judged by their static evaluation.
+
+    The side to move may always stop capturing and keep the static evaluation (stand pat), so only captures that
+    improve on it matter. Captures that can't lift the score into the window even when the victim is won for free
+    (plus DELTA_MARGIN) are skipped (delta pruning). The victims are tried most valuable first, using the values of
+    pieces.PIECE_VALUES that :py:meth:`Piece.evaluate <pieces.Piece.evaluate>` uses as well.
+
+    :param board: Reference to the board we need to play on
+    :param playAsWhite: True if white is to move
+    :param alpha: Score white is already guaranteed
+    :param beta: Score black is already guaranteed
+    :param depth: Maximum number of captures to follow
+    :return: The score of the position (from whites perspective)
+    """
+    global total_nodes
+    total_nodes += 1
+
+    stand_pat = board.evaluate()
+    if playAsWhite:
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+    else:
+        if stand_pat <= alpha:
+            return stand_pat
+        beta = min(beta, stand_pat)
+
+    if depth <= 0:
+        return stand_pat
+
+    # Collect the captures only, most valuable victim first and least valuable attacker among those
+    captures = []
+    for piece in list(board.iterate_cells_with_pieces(playAsWhite)):
+        for cell in piece.get_reachable_cells():
+            victim = board.get_cell_unchecked(cell)
+            if victim is not None and victim.white != playAsWhite:
+                captures.append((PIECE_VALUES.get(victim.kind, 0), -PIECE_VALUES.get(piece.kind, 0), piece, cell))
+    captures.sort(key=lambda capture: capture[:2], reverse=True)
+
+    best = stand_pat
+    for value, _, piece, cell in captures:
+        # Delta pruning: even winning the victim for free can't reach the window
+        if playAsWhite and stand_pat + value + DELTA_MARGIN <= alpha:
+            continue
+        if not playAsWhite and stand_pat - value - DELTA_MARGIN >= beta:
+            continue
+
+        board.make_move(piece, cell)
+        try:
+            # Captures leaving the own king in check are not allowed
+            if board.is_king_check_cached(playAsWhite):
+                continue
+            score = quiescence(board, not playAsWhite, alpha, beta, depth - 1)
+        finally:
+            board.unmake_move()
+
+        if playAsWhite:
+            best = max(best, score)
+            alpha = max(alpha, score)
+        else:
+            best = min(best, score)
+            beta = min(beta, score)
+
+        if alpha >= beta:
+            break
+
+    return best
+
+
+# Number of killer moves remembered per ply
+KILLER_SLOTS = 2
+
+# Quiet moves that caused a cutoff, per ply of the search (as (from, to) squares, latest first)
+killer_moves = []
+
+# Per color and move (from * 64 + to), how much the move has caused cutoffs so far.
+# Persists across searches, unless the search is deterministic (see start_search).
+history_table = {True: [0] * 4096, False: [0] * 4096}
+
+
+def clear_move_ordering():
+    """
+    Forgets all killer moves and the history table
+    """
+    global killer_moves, history_table
+    killer_moves = []
+    history_table = {True: [0] * 4096, False: [0] * 4096}
+
+
+def start_search(config):
+    """
+    Prepares the move ordering for a new search: The killer moves of the last search are forgotten.
+    In deterministic mode the history table is cleared as well, so the same position always gives the same result.
+
+    :param config: The :py:class:`EngineConfig` of the search, None for DEFAULT_CONFIG
+    """
+    global killer_moves
+
+    if (config if config is not None else DEFAULT_CONFIG).deterministic:
+        clear_move_ordering()
+    else:
+        killer_moves = []
+
+
+def _move_squares(move):
+    """
+    Returns the squares (row * 8 + col) the given move starts and ends on
+    """
+    row, col = move.piece.cell
+    fromSquare = int(row) * 8 + int(col)
+    row, col = move.cell
+    return fromSquare, int(row) * 8 + int(col)
+
+
+def _move_index(move):
+    """
+    Returns the index of the given move in the history table
+    """
+    fromSquare, toSquare = _move_squares(move)
+    return fromSquare * 64 + toSquare
+
+
+def order_moves(board, moves: list[Move], minMaxArg: MinMaxArg) -> list[Move]:
+    """
+    Returns the given moves in the order the alpha-beta search should try them:
+
+    1. The hash move, the best move a search of this position stored in the eval_cache (usually the previous
+       iteration of :py:func:`iterative_deepening`)
+    2. Captures, the most valuable victim first and among those the least valuable attacker first (MVV-LVA)
+    3. The killer moves of this ply, quiet moves that caused a cutoff in a sibling position
+    4. The remaining moves by their history score, how often (and how deep) they caused cutoffs so far
+
+    Moves that are equal in all of this keep their order, so the static evaluation decides between them.
+    """
+    killers = killer_moves[minMaxArg.ply] if minMaxArg.ply < len(killer_moves) else ()
+    history = history_table[minMaxArg.playAsWhite]
+    hashMove = eval_cache.best_move(_cache_key(board, minMaxArg), minMaxArg.playAsWhite)
+
+    def key(move):
+        squares = _move_squares(move)
+        if squares == hashMove:
+            return 3, 0
+
+        victim = board.get_cell_unchecked(move.cell)
+        if victim is not None:
+            return 2, PIECE_VALUES.get(victim.kind, 0) * 1000 - PIECE_VALUES.get(move.piece.kind, 0)
+
+        if squares in killers:
+            return 1, -killers.index(squares)
+
+        return 0, history[squares[0] * 64 + squares[1]]
+
+    return sorted(moves, key=key, reverse=True)
+
+
+def _record_cutoff(board, move, minMaxArg):
+    """
+    Remembers a move that caused a cutoff as killer move of its ply and in the history table
+    """
+    # Captures are tried first anyways
+    if board.get_cell_unchecked(move.cell) is not None:
+        return
+
+    squares = _move_squares(move)
+    history_table[minMaxArg.playAsWhite][squares[0] * 64 + squares[1]] += minMaxArg.depth * minMaxArg.depth
+
+    while len(killer_moves) <= minMaxArg.ply:
+        killer_moves.append([])
+
+    killers = killer_moves[minMaxArg.ply]
+    if squares in killers:
+        killers.remove(squares)
+    killers.insert(0, squares)
+    del killers[KILLER_SLOTS:]
+
+
+def minMaxAlphaBeta(board, minMaxArg: MinMaxArg, alpha: float = float("-inf"), beta: float = float("inf"), rootMoves: list[Move] | None = None) -> Move:
+    """
+    Alpha-beta variant of :py:func:`minMax <engine.minMax>`.
+
+    The same beam of candidate moves is taken from :py:func:`evaluate_all_possible_moves <engine.evaluate_all_possible_moves>`,
+    but the remaining siblings of a move are skipped as soon as that move proves the opponent would never allow this line.
+    alpha is the score white is already guaranteed, beta is the score black is already guaranteed (both from whites perspective).
+
+    Unless the config disables it, the moves of the beam are searched in the order of :py:func:`order_moves <engine.order_moves>`
+    and moves causing a cutoff are recorded as killer moves and in the history table.
+
+    The returned score is the one :py:func:`minMax <engine.minMax>` would find, however scores of pruned nodes are only bounds,
+    not exact values. Without move ordering the returned move is the same one as well (without the random top three pick at the root),
+    with move ordering another move of the same score can be returned.
+
+    :param board: Reference to the board we need to play on
+    :param minMaxArg: The combined arguments for the mini-max search algorithm.
+    :param alpha: Lower bound of the search window
+    :param beta: Upper bound of the search window
+    :param rootMoves: Optional list of moves to search in this order instead of calling evaluate_all_possible_moves.
+        The scores of the moves are overwritten with the search results.
+    :return: Return the best move to make in the current situation.
+    :raises SearchTimeout: If minMaxArg.deadline has passed or minMaxArg.stop returns True.
+        The board is restored before the exception leaves this method.
+    """
+    global total_nodes
+    total_nodes += 1
+
+    _check_interrupt(minMaxArg)
+
+    possible_moves = rootMoves if rootMoves is not None else evaluate_all_possible_moves(board, minMaxArg)
+
+    # Return a 'None'-Move if no possible moves are left
+    if not possible_moves:
+        return Move(None, (None, None), score=-1_000_000 if minMaxArg.playAsWhite else 1_000_000)
+
+    if minMaxArg.depth <= 1 and not minMaxArg.config.quiescence:
+        return possible_moves[0]
+
+    # The root moves are given in the order of the previous iteration, which is even better
+    if rootMoves is None and minMaxArg.config.move_ordering:
+        possible_moves = order_moves(board, possible_moves, minMaxArg)
+
+    best_move = None
+    for move in possible_moves:
+        board.make_move(move.piece, move.cell)
+        try:
+            if minMaxArg.depth <= 1:
+                # Settle the captures after the last move instead of trusting the static evaluation
+                move.score = quiescence(board, not minMaxArg.playAsWhite, alpha, beta)
+            else:
+                move.score = minMaxAlphaBeta_cached(board, minMaxArg.next(), alpha, beta).score
+        finally:
+            # Return the board to its original state, even if the search was interrupted
+            board.unmake_move()
+
+        # Only a strictly better move replaces the current one, so ties resolve like the stable sort in minMax
+        if minMaxArg.playAsWhite:
+            if best_move is None or move.score > best_move.score:
+                best_move = move
+            alpha = max(alpha, move.score)
+        else:
+            if best_move is None or move.score < best_move.score:
+                best_move = move
+            beta = min(beta, move.score)
+
+        # The opponent already has a better alternative, no need to look at the remaining moves
+        if alpha >= beta:
+            if minMaxArg.config.move_ordering:
+                _record_cutoff(board, move, minMaxArg)
+            break
+
+    return best_move
+
+
+def iterative_deepening(board, time_limit: float, playAsWhite: bool = True, maxDepth: int = MAX_ITERATIVE_DEPTH, config: EngineConfig | None = None) -> Move:
+    """
+    Searches with :py:func:`minMaxAlphaBeta <engine.minMaxAlphaBeta>` to depth 1, 2, 3, ... until time_limit is used up
+    and returns the best move of the deepest search that finished in time.
+
+    The root moves are taken from :py:func:`evaluate_all_possible_moves <engine.evaluate_all_possible_moves>` once.
+    Every iteration searches them in the order of the scores the previous iteration assigned to them,
+    so the best move found so far is searched first and the window closes early.
+
+    The first iteration is always completed, even if it takes longer than time_limit.
+
+    :param board: Reference to the board we need to play on
+    :param time_limit: Time budget in seconds
+    :param playAsWhite: True if the move is searched for white
+    :param maxDepth: Depth after which the search stops, even if there is time left
+    :param config: The :py:class:`EngineConfig` of this search, defaults to DEFAULT_CONFIG
+    :return: Return the best move to make in the current situation.
+    """
+    global last_completed_depth
+
+    deadline = time.perf_counter() + time_limit
+    start_search(config)
+    root_moves = evaluate_all_possible_moves(board, MinMaxArg(1, playAsWhite, config=config))
+    last_completed_depth = 0
+
+    # Without any moves left there is nothing to deepen
+    if not root_moves:
+        return Move(None, (None, None), score=-1_000_000 if playAsWhite else 1_000_000)
+
+    best_move = None
+    for depth in range(1, maxDepth + 1):
+        try:
+            # Never interrupt the first iteration, so there always is a move to return
+            move = minMaxAlphaBeta(board, MinMaxArg(depth, playAsWhite, deadline if depth > 1 else None, config), rootMoves=root_moves)
+        except SearchTimeout:
+            break
+
+        # The scores of the moves get overwritten by the next iteration, so keep a copy of the result
+        best_move = Move(move.piece, move.cell, move.score)
+        last_completed_depth = depth
+
+        # Feed the results into the move order of the next iteration, best moves first
+        root_moves.sort(key=lambda move: move.score, reverse=playAsWhite)
+
+        if time.perf_counter() > deadline:
+            break
+
+    return best_move
+
+
+def _search_root_move(backend, boardHash, moveFrom, moveTo, minMaxArg, alphaBeta):
+    """
+    Worker of :py:func:`parallel_root_search`: Rebuilds the board from its hash, makes the given root move
+    and searches the answers of the opponent.
+
+    :return: The score of the root move and the number of nodes searched
+    """
+    global total_nodes
+    total_nodes = 0
+
+    board = backend()
+    board.load_from_hash(boardHash)
+    board.make_move(board.get_cell(divmod(moveFrom, 8)), divmod(moveTo, 8))
+
+    # The worker processes are reused, start like the serial search would
+    start_search(minMaxArg.config)
+
+    if alphaBeta:
+        score = minMaxAlphaBeta_cached(board, minMaxArg).score
+    else:
+        score = minMax_cached(board, minMaxArg).score
+
+    return score, total_nodes
+
+
+_executor = None
+_executor_workers = 0
+
+
+def _get_executor(workers):
+    """
+    Returns a process pool with the given number of workers. The pool is kept for later searches,
+    so the processes (and their eval_cache) are only started once.
+    """
+    global _executor, _executor_workers
+
+    if _executor is None or _executor_workers != workers:
+        shutdown_executor()
+        _executor = ProcessPoolExecutor(max_workers=workers)
+        _executor_workers = workers
+
+    return _executor
+
+
+def shutdown_executor():
+    """
+    Stops the worker processes of :py:func:`parallel_root_search`
+    """
+    global _executor, _executor_workers
+
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+        _executor_workers = 0
+
+
+def parallel_root_search(board, minMaxArg: MinMaxArg, alphaBeta: bool = False) -> Move:
+    """
+    Mini-max search with the root moves split across minMaxArg.config.workers processes.
+
+    The root moves are taken from :py:func:`evaluate_all_possible_moves <engine.evaluate_all_possible_moves>` like in
+    :py:func:`minMax <engine.minMax>`. Every worker gets the board as :py:meth:`hash <board.BoardBase.hash>` string
+    and one root move, searches the answers and sends back the score. The best move is picked like minMax does,
+    so in deterministic mode the result is identical to the serial search. With alphaBeta, each worker runs
+    :py:func:`minMaxAlphaBeta <engine.minMaxAlphaBeta>` with the full window, which gives the exact scores as well.
+
+    :param board: Reference to the board we need to play on
+    :param minMaxArg: The combined arguments for the mini-max search algorithm.
+    :param alphaBeta: Search the root moves with alpha-beta pruning
+    :return: Return the best move to make in the current situation.
+    """
+    global total_nodes
+
+    # A single ply (with the quiescence search at the horizon) is not worth sending to the workers
+    if minMaxArg.depth <= 1:
+        return minMaxAlphaBeta_cached(board, minMaxArg) if alphaBeta else minMax_cached(board, minMaxArg)
+
+    total_nodes += 1
+
+    config = minMaxArg.config
+    possible_moves = evaluate_all_possible_moves(board, minMaxArg)
+
+    # Return a 'None'-Move if no possible moves are left
+    if not possible_moves:
+        return Move(None, (None, None), score=-1_000_000 if minMaxArg.playAsWhite else 1_000_000)
+
+    # The serial alpha-beta search keeps the first of equally scored moves in this order, the stable sort below does the same
+    if alphaBeta and config.move_ordering:
+        possible_moves = order_moves(board, possible_moves, minMaxArg)
+
+    boardHash = board.hash()
+    executor = _get_executor(config.workers)
+    futures = []
+    for move in possible_moves:
+        # Without determinism, every worker gets its own seed drawn from this search, so the jitter differs between them
+        workerConfig = config
+        if not config.deterministic:
+            workerConfig = copy.copy(config)
+            workerConfig.seed = config.rng.getrandbits(64)
+            workerConfig.rng = random.Random(workerConfig.seed)
+
+        row, col = move.piece.cell
+        moveFrom = int(row) * 8 + int(col)
+        row, col = move.cell
+        moveTo = int(row) * 8 + int(col)
+        nextArg = MinMaxArg(minMaxArg.depth - 1, not minMaxArg.playAsWhite, None, workerConfig)
+        futures.append(executor.submit(_search_root_move, type(board), boardHash, moveFrom, moveTo, nextArg, alphaBeta))
+
+    for move, future in zip(possible_moves, futures):
+        move.score, nodes = future.result()
+        total_nodes += nodes
+
+    # Choose a random move out of the top three, just like minMax at the root
+    if minMaxArg.depth == config.depth and not config.deterministic:
+        if config.rng.randint(1, 100) <= config.random_move_chance:
+            top_three_moves = possible_moves[:3]
+            config.rng.shuffle(top_three_moves)
+            return top_three_moves[0]
+
+    # Sort ascending/descending depending on 'minMaxArg.playAsWhite', ties keep the order of the serial search
+    possible_moves.sort(key=lambda move: move.score, reverse=minMaxArg.playAsWhite)
+    return possible_moves[0]
+
+
+def _lazy_smp_helper(backend, boardHash, table, depth, playAsWhite, config, rotation):
+    """
+    Helper of :py:func:`lazy_smp_search`: Searches the given position with the shared transposition table
+    until it is done or the main search sets the stop flag of the table.
+
+    :return: The number of nodes searched
+    """
+    global eval_cache, total_nodes
+
+    local_cache = eval_cache
+    eval_cache = table
+    total_nodes = 0
+
+    board = backend()
+    board.load_from_hash(boardHash)
+    start_search(config)
+
+    try:
+        # Start with a different root move than the other searches, so the workers fill different parts of the table first
+        root_moves = evaluate_all_possible_moves(board, MinMaxArg(1, playAsWhite, config=config))
+        if root_moves:
+            rotation %= len(root_moves)
+            root_moves = root_moves[rotation:] + root_moves[:rotation]
+            minMaxAlphaBeta(board, MinMaxArg(depth, playAsWhite, None, config, table.stopped), rootMoves=root_moves)
+    except SearchTimeout:
+        pass
+    finally:
+        eval_cache = local_cache
+        table.close()
+
+    return total_nodes
+
+
+def lazy_smp_search(board, minMaxArg: MinMaxArg, size_mb: int = 16) -> Move:
+    """
+    Alpha-beta search in the style of Lazy SMP: minMaxArg.config.workers - 1 helper processes search the same position
+    while this process runs the main search. All of them share one :py:class:`SharedTranspositionTable <transposition.SharedTranspositionTable>`,
+    so the main search picks up the results (and cutoffs) the helpers already found.
+
+    The helpers search to the same depth as the main search, so the table only returns their results for exactly
+    that search depth. But every helper starts with a different root move, so they fill different parts of the table
+    and the main search finds results of subtrees it has not searched yet. Once the main search is done, the helpers
+    are stopped through the stop flag of the table. The result is the one of the main search, so the score is the one
+    of the serial alpha-beta search (the hash moves found by the helpers can make it pick another move of the same score).
+
+    :param board: Reference to the board we need to play on
+    :param minMaxArg: The combined arguments for the mini-max search algorithm.
+    :param size_mb: Memory budget of the shared transposition table
+    :return: Return the best move to make in the current situation.
+    """
+    global eval_cache, total_nodes
+
+    config = minMaxArg.config
+    table = SharedTranspositionTable(size_mb)
+    boardHash = board.hash()
+
+    executor = _get_executor(config.workers - 1)
+    futures = [
+        executor.submit(
+            _lazy_smp_helper, type(board), boardHash, table,
+            minMaxArg.depth, minMaxArg.playAsWhite, config, helper,
+        )
+        for helper in range(1, config.workers)
+    ]
+
+    local_cache = eval_cache
+    eval_cache = table
+    try:
+        return minMaxAlphaBeta_cached(board, minMaxArg)
+    finally:
+        eval_cache = local_cache
+        table.stop()
+
+        # The helpers must be done before the table is removed. Their results are not needed, so a failed helper
+        # must not replace the result (or the exception) of the main search.
+        wait(futures)
+        total_nodes += sum(future.result() for future in futures if future.exception() is None)
+        table.close()
+
+
+# Number of likely replies of the opponent searched by ponder
+PONDER_REPLIES = 5
+
+
+def ponder(board, playAsWhite: bool, stop, alphaBeta: bool = False, config: EngineConfig | None = None, replies: int = PONDER_REPLIES) -> int:
+    """
+    Searches on the opponents time: For the most likely replies of the opponent (the best ones according to
+    :py:func:`evaluate_all_possible_moves <engine.evaluate_all_possible_moves>`), the search :py:func:`suggest_move <engine.suggest_move>`
+    will run once the reply is played is done ahead of time. The results end up in the eval_cache, so if the opponent
+    plays one of these replies, suggest_move returns the cached move right away.
+
+    :param board: Reference to the board with the opponent to move, it is restored before returning
+    :param playAsWhite: True if the opponent plays white
+    :param stop: Function returning True once pondering has to end (e.g. because the opponent has moved)
+    :param alphaBeta: Ponder with the search suggest_move uses with this alphaBeta argument
+    :param config: The :py:class:`EngineConfig` of the search to prepare, defaults to DEFAULT_CONFIG
+    :param replies: Number of replies to search
+    :return: The number of replies searched completely
+    """
+    config = config if config is not None else DEFAULT_CONFIG
+    search = minMaxAlphaBeta_cached if alphaBeta else minMax_cached
+    start_search(config)
+
+    done = 0
+    for reply in evaluate_all_possible_moves(board, MinMaxArg(1, playAsWhite, config=config), replies):
+        if stop():
+            break
+
+        board.make_move(reply.piece, reply.cell)
+        try:
+            search(board, MinMaxArg(config.depth, not playAsWhite, None, config, stop))
+        except SearchTimeout:
+            break
+        finally:
+            board.unmake_move()
+
+        done += 1
+
+    return done
+
+
+def suggest_random_move(board, config=None):
     """
     Pick a random legal move for White.
 
@@ -251,6 +899,8 @@ def suggest_random_move(board):
     - return a Move object so the UI can handle it just like any other engine move
 
     If there are no legal moves at all, return None.
+
+    :param config: The :py:class:`EngineConfig` whose random number generator is used, defaults to DEFAULT_CONFIG
     """
     # TODO: Implement a valid random move
 
@@ -271,18 +921,74 @@ def suggest_random_move(board):
         return None
 
     # pick random dictionary
-    random_dict = random.choice(pieces_and_movement)
-    return Move(random_dict["piece_name"], random.choice(random_dict["moves"]), 0)
+    rng = (config if config is not None else DEFAULT_CONFIG).rng
+    random_dict = rng.choice(pieces_and_movement)
+    return Move(random_dict["piece_name"], rng.choice(random_dict["moves"]), 0)
 
 
-def suggest_move(board):
+def suggest_move(board, alphaBeta=False, time_limit=None, config=None):
     """
     Helper function to start the mini-max algorithm.
+
+    :param alphaBeta: Use :py:func:`minMaxAlphaBeta <engine.minMaxAlphaBeta>` instead of the plain mini-max search
+    :param time_limit: If given, search with :py:func:`iterative_deepening <engine.iterative_deepening>`
+        for this many seconds instead of searching to a fixed depth
+    :param config: The :py:class:`EngineConfig` of this search (depth, randomness, workers), defaults to DEFAULT_CONFIG
     """
-    return minMax_cached(board, MinMaxArg())
+    if time_limit is not None:
+        return iterative_deepening(board, time_limit, config=config)
+
+    start_search(config)
+
+    if config is not None and config.workers > 1:
+        if config.lazy_smp:
+            return lazy_smp_search(board, MinMaxArg(config=config))
+        return parallel_root_search(board, MinMaxArg(config=config), alphaBeta)
 
-eval_cache = {}
+    if alphaBeta:
+        return minMaxAlphaBeta_cached(board, MinMaxArg(config=config))
+
+    return minMax_cached(board, MinMaxArg(config=config))
+
+eval_cache = TranspositionTable()
 total_hits = 0
+total_nodes = 0
+last_completed_depth = 0
+
+
+def _cache_key(board, minMaxArg):
+    """
+    Returns the eval_cache key of the current board configuration. Searches with and without quiescence
+    get different keys, so neither uses the scores of the other.
+    """
+    if minMaxArg.config.quiescence:
+        return board.zobrist ^ QUIESCENCE_KEY
+    return board.zobrist
+
+
+def _store_move(board, minMaxArg, move, bound):
+    """
+    Stores the given move as the search result of the current board configuration in the eval_cache.
+    """
+    move_from = move_to = None
+    if move.piece is not None:
+        row, col = move.piece.cell
+        move_from = int(row) * 8 + int(col)
+        row, col = move.cell
+        move_to = int(row) * 8 + int(col)
+
+    eval_cache.store(_cache_key(board, minMaxArg), minMaxArg.playAsWhite, minMaxArg.depth, move.score, bound, move_from, move_to)
+
+
+def _move_from_entry(board, entry):
+    """
+    Turns an eval_cache entry of the current board configuration back into a :py:class:`Move`.
+    """
+    if entry.move_from is None:
+        return Move(None, (None, None), score=entry.score)
+
+    piece = board.get_cell(divmod(entry.move_from, 8))
+    return Move(piece, divmod(entry.move_to, 8), entry.score)
 
 
 def minMax_cached(board, minMaxArg):
@@ -293,18 +999,48 @@ def minMax_cached(board, minMaxArg):
     the mini-max algorithm again. This can save computation time as
     it avoid to repeat evaluations over and over again. 
     """
-    global eval_cache, total_hits
+    global total_hits
 
-    # Calculate a unique hash code for the current board position and search depth
-    hash = str(minMaxArg.depth) + board.hash()
-    if hash in eval_cache:
+    # Look up the current board position for the side to move and search depth
+    entry = eval_cache.probe(_cache_key(board, minMaxArg), minMaxArg.playAsWhite, minMaxArg.depth)
+    if entry is not None and entry.bound == EXACT:
         total_hits += 1
-        # print(f"Cache hit! Cache has {len(eval_cache.keys())} entries with {total_hits} hits so far")
-        return eval_cache[hash]
+        return _move_from_entry(board, entry)
 
     # Its not the cache so do the actual evaluation
     bestMove = minMax(board, minMaxArg)
 
     # Cache it for later
-    eval_cache[hash] = bestMove
+    _store_move(board, minMaxArg, bestMove, EXACT)
+    return bestMove
+
+
+def minMaxAlphaBeta_cached(board, minMaxArg, alpha=float("-inf"), beta=float("inf")):
+    """
+    A cached version of the minMaxAlphaBeta method. It shares the cache with
+    :py:func:`minMax_cached <engine.minMax_cached>`. Scores on or outside
+    the search window are mere bounds and are stored as such, a cached bound
+    is only used if it decides the current window as well.
+    """
+    global total_hits
+
+    entry = eval_cache.probe(_cache_key(board, minMaxArg), minMaxArg.playAsWhite, minMaxArg.depth)
+    if entry is not None:
+        if (
+            entry.bound == EXACT
+            or (entry.bound == LOWER_BOUND and entry.score >= beta)
+            or (entry.bound == UPPER_BOUND and entry.score <= alpha)
+        ):
+            total_hits += 1
+            return _move_from_entry(board, entry)
+
+    bestMove = minMaxAlphaBeta(board, minMaxArg, alpha, beta)
+
+    if bestMove.score <= alpha:
+        bound = UPPER_BOUND
+    elif bestMove.score >= beta:
+        bound = LOWER_BOUND
+    else:
+        bound = EXACT
+    _store_move(board, minMaxArg, bestMove, bound)
     return bestMove
@@ -0,0 +1,113 @@
+import glob
+import sys
+import time
+
+from board import Board
+from compact_board import CompactBoard
+from bitboard import BitBoard
+from util import map_piece_to_character, cell_to_string
+
+BACKENDS = {"board": Board, "compact": CompactBoard, "bitboard": BitBoard}
+
+
+def generate_moves(board, white):
+    """
+    Returns a list of all valid moves (piece, cell) of the given color.
+    The pieces are collected before any move is made, as making moves changes the board being iterated.
+    """
+    return [(piece, cell) for piece in list(board.iterate_cells_with_pieces(white)) for cell in piece.get_valid_cells()]
+
+
+def perft(board, depth, white=True):
+    """
+    Counts the leaf nodes of the move tree of the given depth (performance test of the move generator).
+
+    :param board: Board to start from, it is restored after counting
+    :param depth: Number of half moves to play
+    :param white: True if white moves first
+    :return: The number of positions reached after depth half moves
+    """
+    if depth == 0:
+        return 1
+
+    moves = generate_moves(board, white)
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for piece, cell in moves:
+        board.make_move(piece, cell)
+        try:
+            nodes += perft(board, depth - 1, not white)
+        finally:
+            board.unmake_move()
+
+    return nodes
+
+
+def divide(board, depth, white=True):
+    """
+    Runs perft for every move of the given color separately (divide mode), which helps to narrow down
+    in which line two move generators disagree.
+
+    :return: A dictionary mapping each move (e.g. "Nb1c3") to the number of leaf nodes below it
+    """
+    result = {}
+    for piece, cell in generate_moves(board, white):
+        name = map_piece_to_character(piece) + cell_to_string(piece.cell) + cell_to_string(cell)
+        board.make_move(piece, cell)
+        try:
+            result[name] = perft(board, depth - 1, not white)
+        finally:
+            board.unmake_move()
+
+    return result
+
+
+def load_position(board, name):
+    """
+    Loads a benchmark position into the given board, "start" is the start position and any other name a board file
+    """
+    if name == "start":
+        board.reset()
+    else:
+        board.load_from_disk(name)
+
+
+def benchmark_positions():
+    """
+    Returns the names of the benchmark positions, the start position followed by all test boards
+    """
+    return ["start"] + sorted(glob.glob("tests/*.board"))
+
+
+def run_benchmark(max_depth=4, backend=Board, out=sys.stdout):
+    """
+    Runs perft on all benchmark positions for depth 1 up to max_depth and reports nodes per second.
+
+    :return: A list of (position, depth, nodes, seconds) tuples
+    """
+    results = []
+    for name in benchmark_positions():
+        board = backend()
+        load_position(board, name)
+
+        for depth in range(1, max_depth + 1):
+            start = time.perf_counter()
+            nodes = perft(board, depth)
+            seconds = time.perf_counter() - start
+
+            results.append((name, depth, nodes, seconds))
+            print(f"{name:24} depth {depth}: {nodes:>9} nodes {seconds:8.3f}s {nodes / max(seconds, 1e-9):>12.0f} nodes/s", file=out)
+
+    total_nodes = sum(nodes for _, _, nodes, _ in results)
+    total_seconds = sum(seconds for _, _, _, seconds in results)
+    print(f"{'total':24}         {total_nodes:>9} nodes {total_seconds:8.3f}s {total_nodes / max(total_seconds, 1e-9):>12.0f} nodes/s", file=out)
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python perft.py [max_depth] [board|compact|bitboard]
+    max_depth = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    backend = BACKENDS[sys.argv[2]] if len(sys.argv) > 2 else Board
+    run_benchmark(max_depth, backend)
@@ -1,5 +1,73 @@
 import numpy as np
 
+# Numerical piece kinds, black pieces additionally carry the BLACK flag in their code
+PAWN = 1
+KNIGHT = 2
+BISHOP = 3
+ROOK = 4
+QUEEN = 5
+KING = 6
+BLACK = 8
+
+# Material value of every piece kind
+PIECE_VALUES = {PAWN: 100,
+                ROOK: 500,
+                KNIGHT: 300,
+                BISHOP: 400,
+                QUEEN: 900,
+                KING: 100_000}
+
+# Material value for every piece code, positive for white and negative for black pieces
+SIGNED_PIECE_VALUES = [0] * 16
+for _kind, _value in PIECE_VALUES.items():
+    SIGNED_PIECE_VALUES[_kind] = _value
+    SIGNED_PIECE_VALUES[_kind | BLACK] = -_value
+
+# Turn on/off 'Thread points' in Piece.evaluate
+# Modes: 'Threat' | None = Standard-Mode
+# EVALUATION_MODE = "Threat"
+EVALUATION_MODE = None
+
+# One (row, col) tuple per square (row * 8 + col)
+CELLS = tuple((square // 8, square % 8) for square in range(64))
+
+
+def _build_rays(directions):
+    """
+    Returns for every square a list of rays (one per direction). Each ray lists the cells from near to far until the edge of the board.
+    """
+    rays = []
+    for row, col in CELLS:
+        square_rays = []
+        for dir_y, dir_x in directions:
+            ray = []
+            y, x = row + dir_y, col + dir_x
+            while 0 <= y < 8 and 0 <= x < 8:
+                ray.append(CELLS[y * 8 + x])
+                y, x = y + dir_y, x + dir_x
+            square_rays.append(ray)
+        rays.append(square_rays)
+    return rays
+
+
+def _build_steps(offsets):
+    """
+    Returns for every square the list of cells on the board reachable by a single step of the given offsets
+    """
+    return [[CELLS[(row + dir_y) * 8 + col + dir_x] for dir_y, dir_x in offsets
+             if 0 <= row + dir_y < 8 and 0 <= col + dir_x < 8]
+            for row, col in CELLS]
+
+
+# Precomputed movement tables, indexed by the square (row * 8 + col) of the moving piece
+ROOK_RAYS = _build_rays(((1, 0), (-1, 0), (0, 1), (0, -1)))
+BISHOP_RAYS = _build_rays(((-1, -1), (-1, 1), (1, -1), (1, 1)))
+QUEEN_RAYS = [rook_rays + bishop_rays for rook_rays, bishop_rays in zip(ROOK_RAYS, BISHOP_RAYS)]
+KNIGHT_JUMPS = _build_steps(((-2, -1), (-1, -2), (1, -2), (2, -1), (2, 1), (1, 2), (-1, 2), (-2, 1)))
+KING_STEPS = _build_steps(((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)))
+PAWN_CAPTURES = {True: _build_steps(((1, 1), (1, -1))), False: _build_steps(((-1, 1), (-1, -1)))}
+
+
 class Piece:
     """
     Base class for pieces on the board. 
@@ -7,6 +75,8 @@ class Piece:
     A piece holds a reference to the board, its color and its currently located cell.
     In this class, you need to implement two methods, the "evaluate()" method and the "get_valid_cells()" method.
     """
+    kind = 0
+
     def __init__(self, board, white):
         """
         Constructor for a piece based on provided parameters
@@ -17,6 +87,7 @@ class Piece:
         self.board = board
         self.white = white
         self.cell = None
+        self.code = self.kind if white else self.kind | BLACK
 
 
 
@@ -48,6 +119,39 @@ class Piece:
         """
         return self.board.piece_can_hit_on_cell(self, cell)
 
+    def get_cells_along_rays(self, rays) -> list[tuple[int, int]]:
+        """
+        Returns all cells this piece can reach along the given precomputed rays.
+        Each ray is followed until it is blocked by a piece, the cell of an opposing piece is included.
+        """
+        board = self.board
+        reachable_cells = []
+        for ray in rays:
+            for cell in ray:
+                piece = board.get_cell_unchecked(cell)
+                if piece is None:
+                    reachable_cells.append(cell)
+                    continue
+
+                if piece.white != self.white:
+                    reachable_cells.append(cell)
+                break
+
+        return reachable_cells
+
+    def get_cells_by_steps(self, cells) -> list[tuple[int, int]]:
+        """
+        Returns all of the given precomputed cells that are empty or occupied by an opposing piece.
+        """
+        board = self.board
+        reachable_cells = []
+        for cell in cells:
+            piece = board.get_cell_unchecked(cell)
+            if piece is None or piece.white != self.white:
+                reachable_cells.append(cell)
+
+        return reachable_cells
+
     def evaluate(self) -> int:
         """
         **TODO** Implement a meaningful numerical evaluation of this piece on the board.
@@ -62,27 +166,13 @@ class Piece:
         """
         # TODO: Implement
         # Michel
-        # Turn on/off 'Thread points'
-        # Modes: 'Threat' | None = Standard-Mode
-        # mode = "Threat"
-        mode = None
+        # Turn on/off 'Thread points' with EVALUATION_MODE
+        mode = EVALUATION_MODE
 
         def add_points(piece: Piece) -> int:
             """Add points to the score."""
-            # Piece value dictionary
-            piece_types_and_values = {Pawn: 100,
-                                      Rook: 500,
-                                      Knight: 300,
-                                      Bishop: 400,
-                                      Queen: 900,
-                                      King: 100_000}
-
             # Return a value depending on Piece type
-            for piece_type, piece_value in piece_types_and_values.items():
-                if isinstance(piece, piece_type):
-                    return piece_value
-
-            return 0
+            return PIECE_VALUES.get(piece.kind, 0)
 
         def add_threat_points() -> int:
             """Pieces gain even more points for 'threatening' opponent pieces after a move"""
@@ -117,41 +207,44 @@ class Piece:
         is in check. Use the :py:meth:`is_king_check_cached` method to test for checks. If there is no check after this move, add
         this cell to the list of valid cells. After every move, restore the original board configuration. 
         
-        To temporarily move a piece into a new cell, first store its old position (self.cell) in a local variable. 
-        The target cell might have another piece already placed on it. 
-        Use :py:meth:`get_cell <board.BoardBase.get_cell>` to retrieve that piece (or None if there was none) and store it as well. 
-        Then call :py:meth:`set_cell <board.BoardBase.set_cell>` to place this piece on the target cell and test for any checks given. 
-        After this, restore the original configuration by placing this piece back into its old position (call :py:meth:`set_cell <board.BoardBase.set_cell>` again)
-        and place the previous piece also back into its cell. 
+        To temporarily move a piece into a new cell, call :py:meth:`make_move <board.BoardBase.make_move>` and test for any checks given.
+        The board remembers the old position and any piece hit on the target cell.
+        After this, restore the original configuration by calling :py:meth:`unmake_move <board.BoardBase.unmake_move>`.
         
         :return: Return True 
         """
         # TODO: Implement
         # Michel
-        # Create an empty list and save current position and all reachable cells
+        # Create an empty list and get all reachable cells
         valid_cells = []
         reachable_cells = self.get_reachable_cells()
-        old_pos = self.cell
+        board = self.board
 
-        # Iterate over every reachable cell and store the piece on it (or None)
+        # Iterate over every reachable cell
         for temp_pos in reachable_cells:
-            piece = self.board.get_cell(temp_pos)
-
             # Change the board configuration to the new position and check if own king is 'check'
-            self.board.set_cell(temp_pos, self)
+            board.make_move(self, temp_pos)
 
-            if not self.board.is_king_check_cached(self.is_white()):
+            if not board.is_king_check_cached(self.white):
                 valid_cells.append(temp_pos)
 
             # Return the board to its original state
-            self.board.set_cell(old_pos, self)
-
-            if piece:
-                self.board.set_cell(temp_pos, piece)
+            board.unmake_move()
         
         return valid_cells
 
+    def get_valid_cells_cached(self) -> list[tuple[int, int]]:
+        """
+        Returns the same cells as :py:meth:`get_valid_cells`, but takes them from the legal moves of the whole position
+        (see :py:meth:`get_valid_moves <board.BoardBase.get_valid_moves>`), which are cached per position.
+        The returned list is shared with the cache and must not be modified.
+        """
+        row, col = self.cell
+        return self.board.get_valid_moves(self.white).get(int(row) * 8 + int(col), [])
+
 class Pawn(Piece):  # Bauer
+    kind = PAWN
+
     def __init__(self, board, white):
         super().__init__(board, white)
 
@@ -195,16 +288,18 @@ class Pawn(Piece):  # Bauer
 
             reachable_cells.append(move_pos)
 
-        # Iterate over diagonal cells (range 1), add to list if enemy is on cell
-        for val in (1, -1):
-            hit_pos = ((curr_y + dir_y), (curr_x + val))
+        # Iterate over the precomputed diagonal cells, add to list if enemy is on cell
+        for hit_pos in PAWN_CAPTURES[self.white][curr_y * 8 + curr_x]:
+            piece = self.board.get_cell_unchecked(hit_pos)
 
-            if self.can_hit_on_cell(hit_pos):
+            if piece is not None and piece.white != self.white:
                 reachable_cells.append(hit_pos)
 
         return reachable_cells
 
 class Rook(Piece):  # Turm
+    kind = ROOK
+
     def __init__(self, board, white):
         super().__init__(board, white)
 
@@ -226,39 +321,14 @@ class Rook(Piece):  # Turm
         """
         # TODO: Implement a method that returns all cells this piece can enter in its next move
         # Michel
-        # Create an empty list, a direction patterns tuple and unpack current position
-        reachable_cells = []
-        dir_patterns = ((1, 0),
-                        (-1, 0),
-                        (0, 1),
-                        (0, -1))
-        curr_y, curr_x = self.cell
-        
-        # Iterate over every possible direction (horizontally and vertically)
-        for dir_y, dir_x in dir_patterns:
-            dir_clear = True
-            count = 0
-
-            # Check if a cell is reachable, one cell at a time
-            # Increase/Decrease the x and y values depending on direction pattern until direction is no longer clear
-            # Append if cell is clear
-            while dir_clear:
-                count += 1
-                new_pos = ((count * dir_y + curr_y), (count * dir_x + curr_x))
-                
-                # Break if direction is blocked by ally or cell is invalid
-                if not self.can_enter_cell(new_pos):
-                    break
-                
-                # Change direction if there is an enemy, but append cell to list
-                elif self.can_hit_on_cell(new_pos):
-                    dir_clear = False
-                
-                reachable_cells.append(new_pos)
-        
-        return reachable_cells
+        # Follow the precomputed horizontal and vertical rays from the current position
+        row, col = self.cell
+        return self.get_cells_along_rays(ROOK_RAYS[row * 8 + col])
+
 
 class Knight(Piece):  # Springer
+    kind = KNIGHT
+
     def __init__(self, board, white):
         super().__init__(board, white)
 
@@ -280,20 +350,14 @@ class Knight(Piece):  # Springer
         """
         # TODO: Implement a method that returns all cells this piece can enter in its next move
         # Alesatir
+        # The jumps are precomputed per square, only the occupation of the target cells is left to check
+        row, col = self.cell
+        return self.get_cells_by_steps(KNIGHT_JUMPS[row * 8 + col])
 
-        reachable_cells = []
-        y, x= self.cell
-        pos_cells = [(y-2,x-1),(y-1,x-2),(y+1,x-2),(y+2,x-1),(y+2,x+1),(y+1,x+2),(y-1,x+2),(y-2,x+1)]   # Alle theorerisch möglichen Zellen
-        
-        for cell in pos_cells:                                      # Über alle theoretisch möglichen Zellen itterieren
-            if self.board.cell_is_valid_and_empty(cell):            # Wenn Zelle leer, appenden
-                reachable_cells.append(cell)
-            elif self.can_enter_cell(cell):                         # Wenn nicht leer, geg. Figur?
-                if self.can_hit_on_cell(cell):
-                    reachable_cells.append(cell)
-        return reachable_cells
 
 class Bishop(Piece):  # Läufer
+    kind = BISHOP
+
     def __init__(self, board, white):
         super().__init__(board, white)
 
@@ -313,34 +377,14 @@ class Bishop(Piece):  # Läufer
         :return: A list of reachable cells this bishop could move into.
         """
         # TODO: Implement a method that returns all cells this piece can enter in its next move  - ricarda
-
-        
-        directions = [ (-1, -1), (-1, 1), (1, -1), (1, 1)] # movement pattern for directions
-        positions = [] 
-
-        def get_available_cells_in_direction(position_tuple, count=1):
-
-            cell_y, cell_x =  position_tuple # starting position
-            new_pos = (cell_y + direction[0] * count, cell_x + direction[1] * count)
-
-            # end condition: if cell is invalid or occupied, end run 
-            if not self.board.cell_is_valid_and_empty(new_pos):
-                if self.can_hit_on_cell(new_pos): # adds latest cell if the cell contains opposing piece
-                    positions.append(new_pos)
-                    
-            else:
-                positions.append(new_pos)
-                count += 1
-                get_available_cells_in_direction( position_tuple, count ) # check next cell in row until end condition is hit
-
-        # run function for every direction in movement patterns
-        for direction in directions:
-            get_available_cells_in_direction(self.cell)
-
-        return positions
+        # Follow the precomputed diagonal rays from the current position
+        row, col = self.cell
+        return self.get_cells_along_rays(BISHOP_RAYS[row * 8 + col])
 
 
 class Queen(Piece):  # Königin
+    kind = QUEEN
+
     def __init__(self, board, white):
         super().__init__(board, white)
 
@@ -362,28 +406,14 @@ class Queen(Piece):  # Königin
         """
         # TODO: Implement a method that returns all cells this piece can enter in its next move
         # Alestair
+        # Rook and bishop rays combined
+        row, col = self.cell
+        return self.get_cells_along_rays(QUEEN_RAYS[row * 8 + col])
 
-        reachable_cells = []
-        direction = [(-1,0), (1,0), (0,-1), (0,1), (-1,-1), (-1,1), (1,-1), (1,1)] # y:1 x:2     # Alle möglichen Richtungen
-
-        for move in direction:
-            for i in range(1, 9):                                                   # Loop für jeden Step
-                start_y, start_x = self.cell                                        # Anfangsposition entpacken
-                move_y, move_x =move                                                # Richtung entpacken
-                new_pos = ((start_y + move_y * i), (start_x + move_x * i))          # Richtung * Step + Anfangsposition
-
-                if self.board.cell_is_valid_and_empty(new_pos):                     # Wenn neue Pos. leer, append
-                    reachable_cells.append(new_pos)
-                elif self.can_enter_cell(new_pos):                                  # Wenn neue Pos. nicht leer, geg. Figur?                
-                    if self.can_hit_on_cell(new_pos):
-                        reachable_cells.append(new_pos)                             # Wenn geg. Figur, Zelle möglich aber danach stopp
-                        break
-                else:                                                               # Wenn keine validen Zelle mehr, beenden
-                    break
-        return reachable_cells
-        
 
 class King(Piece):  # König
+    kind = KING
+
     def __init__(self, board, white):
         super().__init__(board, white)
 
@@ -403,22 +433,10 @@ class King(Piece):  # König
         :return: A list of reachable cells this king could move into.
         """
         # TODO: Implement a method that returns all cells this piece can enter in its next move - Ricarda
-        
-        # get current cell and neighboring cells on current row
-        y, x = self.cell
-        pos_modifier = [ -1, 0, 1 ]
-        positions_x = [ ( y, x + modifier) for modifier in pos_modifier ] 
-        new_position = []
-
-        # get all cells from row and add top and bottom cells to the array
-        for position_y, position_x in positions_x:
-            for modifier in pos_modifier: 
-                new_position.append((position_y + modifier, position_x )) 
-
-        # checks if cell is valid, and can be entered via attack or just being empty
-        available_positions = [position for position in new_position if self.can_enter_cell(position)] 
+        # The neighbouring cells are precomputed per square, only the occupation of the target cells is left to check
+        row, col = self.cell
+        return self.get_cells_by_steps(KING_STEPS[row * 8 + col])
 
-        return available_positions
 
 # ⠀⠀⠀⠀⠀⠀⠀⠀⢀⣴⣿⣿⣿⣧⣤⡴⠞⠛⠛⠛⠛⠛⠛⠛⠛⠳⢦⣤⣴⣿⣿⣿⣦⡄⠀⠀⠀⠀⠀⠀⠀
 # ⠀⠀⠀⠀⠀⠀⠀⠀⣿⣿⡿⢋⡽⠋⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠙⢯⡙⢻⣿⣿⡄⠀⠀⠀⠀⠀⠀
@@ -0,0 +1,144 @@
+import mmap
+import os
+
+# A position file is a sequence of fixed size records: the 64 character hash of a board
+# (see BoardBase.hash, starting with row 8) followed by a line break. The fixed size allows
+# to find any record by its index without reading the records before it.
+HASH_SIZE = 64
+RECORD_SIZE = HASH_SIZE + 1
+DEFAULT_EXTENSION = ".positions"
+
+# Number of records read at once by read_positions
+READ_BLOCK_RECORDS = 4096
+
+
+def _check_hash(hash):
+    """
+    Returns the hash encoded as record, raises a ValueError if it isn't a valid board hash
+    """
+    if len(hash) != HASH_SIZE or "\n" in hash:
+        raise ValueError(f"Invalid board hash: {hash!r}")
+    return hash.encode("ascii") + b"\n"
+
+
+class PositionWriter:
+    """
+    Appends positions to a position file. Use it as context manager or call :py:meth:`close`.
+    """
+
+    def __init__(self, fname):
+        """
+        Constructor, opens (or creates) the given file for appending
+
+        :param fname: Filename to use
+        """
+        self.file = open(fname, "ab")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, board):
+        """
+        Appends the current configuration of the given board
+        """
+        self.write_hash(board.hash())
+
+    def write_hash(self, hash):
+        """
+        Appends the position given by its hash string
+        """
+        self.file.write(_check_hash(hash))
+
+    def close(self):
+        self.file.close()
+
+
+def write_positions(fname, hashes):
+    """
+    Appends all given hash strings to the given position file
+
+    :return: The number of positions written
+    """
+    count = 0
+    with PositionWriter(fname) as writer:
+        for hash in hashes:
+            writer.write_hash(hash)
+            count += 1
+    return count
+
+
+def read_positions(fname, start=0):
+    """
+    Generator yielding the hash strings of all positions in the given file, reading blocks of many records at a time
+
+    :param fname: Filename to use
+    :param start: Index of the first position to yield
+    """
+    with open(fname, "rb") as f:
+        f.seek(start * RECORD_SIZE)
+        while True:
+            block = f.read(READ_BLOCK_RECORDS * RECORD_SIZE)
+            if not block:
+                return
+
+            for offset in range(0, len(block) - HASH_SIZE, RECORD_SIZE):
+                yield block[offset:offset + HASH_SIZE].decode("ascii")
+
+
+class PositionFile:
+    """
+    Random access to the positions of a position file by index, backed by a memory map of the file.
+    Use it as context manager or call :py:meth:`close`.
+    """
+
+    def __init__(self, fname):
+        """
+        Constructor, maps the given file into memory
+
+        :param fname: Filename to use
+        """
+        self.file = open(fname, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.count = size // RECORD_SIZE
+
+        # Empty files can't be mapped
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        """
+        Returns the hash string of the position with the given index
+        """
+        if index < 0:
+            index += self.count
+        if index < 0 or index >= self.count:
+            raise IndexError(index)
+
+        offset = index * RECORD_SIZE
+        return self.map[offset:offset + HASH_SIZE].decode("ascii")
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def load(self, board, index):
+        """
+        Loads the position with the given index into the given board
+        """
+        board.load_from_hash(self[index])
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
@@ -1,14 +1,31 @@
 import unittest
 import json
+import pickle
+import time
+import glob
+import random
+import os
+import tempfile
 from unittest_prettify.colorize import (
     colorize,
     RED,
 )
 from board import Board, InvalidRowException, InvalidColumnException
+from compact_board import CompactBoard
+from bitboard import BitBoard
 from pieces import Pawn, Queen, Pawn, Rook, Knight, Bishop, King
 from util import cell_to_string, map_piece_to_character, map_piece_to_fullname
 
+import engine
 from engine import evaluate_all_possible_moves, MinMaxArg
+from concurrent.futures import ProcessPoolExecutor
+from transposition import TranspositionTable, SharedTranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND, SHARED_HEADER_SIZE
+from perft import perft, divide, load_position
+from cache import LRUCache
+import board as board_module
+import benchmark
+from analysis import analyse_batch
+from positions import PositionWriter, PositionFile, read_positions, write_positions
 
 
 def iterate_pieces(board):
@@ -50,6 +67,55 @@ def print_movability_error(board, piece, cell, positiveMovement):
   print(text)
 
 
+def check_movability(testCase, board):
+  # Load JSON Test Suite
+  with open("tests/movement_test.json", "rt") as f:
+    suite = json.load(f)
+
+  # Iterate all test cases
+  for testcase in suite["testcases"]:
+    # Load the configuration from disk
+    board.load_from_disk("tests/" + testcase["configuration"])
+
+    movability = testcase["movability"]
+
+    # Now iterate all pieces and check if their actual movability matches the ground truth
+    for piece in iterate_pieces(board):
+      # Write cell in clear text
+      key = cell_to_string(piece.cell)
+
+      # Only the test movability we are supposed to test in the test case
+      if key not in movability:
+        continue
+
+      # Get ground truth from file, turn into a set
+      groundTruth = { (row, col) for row, col in movability[key] }
+
+      # Get actually reachable cells, turn into a set
+      actual = { (int(row), int(col)) for row, col in piece.get_reachable_cells() }
+
+      # If they match, all is fine
+      for cell in groundTruth:
+        if cell in actual:
+          continue
+
+        # If not, output a meaningful message
+        print("\nTestcase name: ", testcase["name"])
+        print_movability_error(board, piece, cell, True)          
+        testCase.fail(f"Movement of the {map_piece_to_fullname(piece)} wrongly implemented!")
+
+      # If they match, all is fine
+      for cell in actual:
+        if cell in groundTruth:
+          continue
+
+        # If not, output a meaningful message
+        print("\nTestcase name: ", testcase["name"])
+        print_movability_error(board, piece, cell, False)
+        
+        testCase.fail(f"Movement of the {map_piece_to_fullname(piece)} wrongly implemented!")
+
+
 class TestBoard(unittest.TestCase):
   def setUp(self):
     self.board = Board()
@@ -204,52 +270,7 @@ class TestBoard(unittest.TestCase):
 
   @colorize(color=RED) 
   def test_B01_movability(self):
-    # Load JSON Test Suite
-    with open("tests/movement_test.json", "rt") as f:
-      suite = json.load(f)
-
-    # Iterate all test cases
-    for testcase in suite["testcases"]:
-      # Load the configuration from disk
-      self.board.load_from_disk("tests/" + testcase["configuration"])
-
-      movability = testcase["movability"]
-
-      # Now iterate all pieces and check if their actual movability matches the ground truth
-      for piece in iterate_pieces(self.board):
-        # Write cell in clear text
-        key = cell_to_string(piece.cell)
-
-        # Only the test movability we are supposed to test in the test case
-        if key not in movability:
-          continue
-
-        # Get ground truth from file, turn into a set
-        groundTruth = { (row, col) for row, col in movability[key] }
-
-        # Get actually reachable cells, turn into a set
-        actual = { (int(row), int(col)) for row, col in piece.get_reachable_cells() }
-
-        # If they match, all is fine
-        for cell in groundTruth:
-          if cell in actual:
-            continue
-
-          # If not, output a meaningful message
-          print("\nTestcase name: ", testcase["name"])
-          print_movability_error(self.board, piece, cell, True)          
-          self.fail(f"Movement of the {map_piece_to_fullname(piece)} wrongly implemented!")
-
-        # If they match, all is fine
-        for cell in actual:
-          if cell in groundTruth:
-            continue
-
-          # If not, output a meaningful message
-          print("\nTestcase name: ", testcase["name"])
-          print_movability_error(self.board, piece, cell, False)
-          
-          self.fail(f"Movement of the {map_piece_to_fullname(piece)} wrongly implemented!")
+    check_movability(self, self.board)
 
   @colorize(color=RED) 
   def test_B02_iterate_pieces_empty_board(self):
@@ -442,6 +463,798 @@ class TestBoard(unittest.TestCase):
     moves = evaluate_all_possible_moves(self.board, minMaxArg=MinMaxArg(playAsWhite=True), maximumNumberOfMoves=6)
     self.assertEqual(len(moves), 6, "evaluate_all_possible_moves should respect requested amount of moves")
 
+  # ---------------------------------------------------------------------------
+  # Phase D – Engine-Performance
+  # ---------------------------------------------------------------------------
+
+  @colorize(color=RED)
+  def test_D01_alpha_beta_matches_min_max(self):
+    self.board.load_from_disk("tests/random2.board")
+
+    # Disable the random jitter, otherwise both searches can't be compared.
+    # Move ordering could pick another move of the same score (see test_D18)
+    config = engine.EngineConfig(deterministic=True, move_ordering=False)
+
+    engine.eval_cache.clear()
+    engine.total_nodes = 0
+    expected = engine.minMax_cached(self.board, MinMaxArg(config=config))
+    minMaxNodes = engine.total_nodes
+
+    engine.eval_cache.clear()
+    engine.total_nodes = 0
+    actual = engine.minMaxAlphaBeta_cached(self.board, MinMaxArg(config=config))
+    alphaBetaNodes = engine.total_nodes
+
+    engine.eval_cache.clear()
+
+    self.assertIs(expected.piece, actual.piece, "Alpha-beta search should pick the same piece as minMax")
+    self.assertEqual(tuple(expected.cell), tuple(actual.cell), "Alpha-beta search should pick the same cell as minMax")
+    self.assertAlmostEqual(expected.score, actual.score, msg="Alpha-beta search should find the same score as minMax")
+    self.assertLess(alphaBetaNodes, minMaxNodes, "Alpha-beta search should visit fewer nodes than minMax")
+
+  @colorize(color=RED)
+  def test_D02_zobrist_key_is_maintained_incrementally(self):
+    self.board.load_from_disk("tests/random1.board")
+    beforeKey = self.board.zobrist
+
+    # Generating moves places and restores pieces, the key must end up where it started
+    for piece in iterate_pieces(self.board):
+      piece.get_valid_cells()
+    self.assertEqual(beforeKey, self.board.zobrist, "set_cell must restore the zobrist key when a move is undone")
+
+    # After a real move, the key must match the key of the same configuration built from scratch
+    self.board.set_cell((2, 4), self.board.get_cell((2, 7)))
+    other = Board()
+    other.load_from_memory(str(self.board))
+    self.assertEqual(other.zobrist, self.board.zobrist, "Equal configurations must have equal zobrist keys")
+    self.assertNotEqual(beforeKey, self.board.zobrist, "Different configurations should have different zobrist keys")
+
+  @colorize(color=RED)
+  def test_D03_transposition_table_is_side_aware_and_bounded(self):
+    table = TranspositionTable(size_mb=1)
+    key = self.board.zobrist
+
+    table.store(key, True, 3, 12.0, EXACT, 1 * 8 + 4, 3 * 8 + 4)
+    table.store(key, False, 3, -7.0, LOWER_BOUND)
+
+    self.assertEqual(table.probe(key, True, 3).score, 12.0, "Transposition table should return the entry for white")
+    self.assertEqual(table.probe(key, False, 3).score, -7.0, "Transposition table must not mix up white and black entries")
+    self.assertEqual(table.probe(key, False, 3).bound, LOWER_BOUND, "Transposition table should keep the bound type")
+    self.assertIsNone(table.probe(key, True, 2), "Transposition table should not return entries of a different depth")
+
+    # Storing far more entries than there are slots must not grow the table
+    for index in range(4 * len(table.entries)):
+      table.store(index * 7919, index % 2 == 0, index % 5, float(index), EXACT)
+    self.assertLessEqual(len(table), 2 * table.buckets, "Transposition table must not grow beyond its budget")
+
+  @colorize(color=RED)
+  def test_D04_iterative_deepening_respects_time_limit(self):
+    self.board.load_from_disk("tests/random1.board")
+    beforeHash = self.board.hash()
+
+    start = time.perf_counter()
+    move = engine.suggest_move(self.board, time_limit=0.3)
+    elapsed = time.perf_counter() - start
+
+    self.assertIsNotNone(move.piece, "Iterative deepening should return a move")
+    self.assertIn(tuple(move.cell), [tuple(cell) for cell in move.piece.get_valid_cells()], "Iterative deepening should return a valid move")
+    self.assertGreaterEqual(engine.last_completed_depth, 1, "Iterative deepening should complete at least one iteration")
+    self.assertLess(elapsed, 0.3 + 1.5, "Iterative deepening should stop shortly after the time limit")
+    self.assertEqual(beforeHash, self.board.hash(), "An interrupted search must not alter board configuration")
+
+    # The best move of any depth is the hash move, the first move tried when searching the position again
+    table = TranspositionTable(size_mb=1)
+    key = self.board.zobrist
+    table.store(key, True, 2, 1.0, EXACT, 1 * 8 + 4, 3 * 8 + 4)
+    table.store(key, True, 3, 2.0, UPPER_BOUND, 1 * 8 + 3, 3 * 8 + 3)
+    self.assertEqual((1 * 8 + 3, 3 * 8 + 3), table.best_move(key, True), "The move of the deepest search should be the hash move")
+    self.assertIsNone(table.best_move(key, False))
+
+    # With the hash moves of the previous iterations, the last iteration searches fewer nodes than a fixed depth search
+    # and fewer than the same iterations without hash moves
+    board = CompactBoard()
+    nodes = [0, 0, 0]
+    try:
+      for fname in ("start", "tests/random1.board", "tests/random2.board"):
+        load_position(board, fname)
+        config = engine.EngineConfig(6, deterministic=True, quiescence=True)
+        scores = []
+        for index, (depths, hashMoves) in enumerate((((6,), True), (range(1, 7), False), (range(1, 7), True))):
+          engine.eval_cache.clear()
+          if not hashMoves:
+            engine.eval_cache.best_move = lambda key, white: None
+          engine.start_search(config)
+          for depth in depths:
+            engine.total_nodes = 0
+            move = engine.minMaxAlphaBeta_cached(board, MinMaxArg(depth, config=config))
+          nodes[index] += engine.total_nodes
+          scores.append(move.score)
+          vars(engine.eval_cache).pop("best_move", None)
+        self.assertEqual(1, len(set(scores)), fname)
+    finally:
+      vars(engine.eval_cache).pop("best_move", None)
+      engine.eval_cache.clear()
+
+    self.assertLess(nodes[2], nodes[0], "The earlier iterations should make the last one cheaper")
+    self.assertLess(nodes[2], nodes[1], "The hash moves should make the last iteration cheaper")
+
+  @colorize(color=RED)
+  def test_D05_compact_board_matches_board(self):
+    self.check_backend_matches_board(CompactBoard)
+
+  def check_backend_matches_board(self, backend):
+    for fname in sorted(glob.glob("tests/*.board")):
+      other = backend()
+      other.load_from_disk(fname)
+      self.board.load_from_disk(fname)
+
+      self.assertEqual(self.board.hash(), other.hash(), f"{backend.__name__} should load {fname} like Board")
+      self.assertEqual(self.board.zobrist, other.zobrist, f"{backend.__name__} should have the same zobrist key as Board for {fname}")
+      self.assertAlmostEqual(self.board.evaluate(), other.evaluate(), msg=f"{backend.__name__} should evaluate {fname} like Board")
+
+      for color in [True, False]:
+        self.assertEqual(self.board.is_king_check(color), other.is_king_check(color), f"{backend.__name__} should detect checks in {fname} like Board")
+
+        expected = [(cell_to_string(piece.cell), sorted(piece.get_valid_cells())) for piece in self.board.iterate_cells_with_pieces(color)]
+        actual = [(cell_to_string(piece.cell), sorted(piece.get_valid_cells())) for piece in other.iterate_cells_with_pieces(color)]
+        self.assertEqual(expected, actual, f"{backend.__name__} should yield the same valid moves as Board for {fname}")
+
+      # A copy must be equal, but independent of the original
+      other.white_to_move = self.board.white_to_move = False
+      for board in (self.board, other):
+        copy = board.copy()
+        self.assertEqual(board.hash(), copy.hash(), f"{type(board).__name__}.copy should copy the configuration")
+        self.assertFalse(copy.white_to_move, f"{type(board).__name__}.copy should copy the side to move")
+      copy.clear_board()
+      self.assertEqual(self.board.hash(), other.hash(), "Changing a copy must not alter the original board")
+
+  @colorize(color=RED)
+  def test_D06_bitboard_movability(self):
+    check_movability(self, BitBoard())
+    self.check_backend_matches_board(BitBoard)
+
+  @colorize(color=RED)
+  def test_D07_king_check_matches_reachable_cells(self):
+    rng = random.Random(7)
+    white = True
+
+    # Play random moves and compare against the definition: an opposing piece can reach the kings cell
+    for _ in range(120):
+      for color in [True, False]:
+        king = self.board.find_king(color)
+        expected = any(
+          (int(king.cell[0]), int(king.cell[1])) in [(int(row), int(col)) for row, col in enemy.get_reachable_cells()]
+          for enemy in self.board.iterate_cells_with_pieces(not color)
+        )
+        self.assertEqual(expected, self.board.is_king_check(color), "is_king_check does not match the reachable cells of the opposing pieces!\n\n" + str(self.board))
+
+      moves = [(piece, cell) for piece in self.board.iterate_cells_with_pieces(white) for cell in piece.get_valid_cells()]
+      if not moves:
+        self.board.reset()
+        white = True
+        continue
+
+      piece, cell = rng.choice(moves)
+      self.board.set_cell(cell, piece)
+      white = not white
+
+  @colorize(color=RED)
+  def test_D08_incremental_evaluation(self):
+    self.board.load_from_disk("tests/random2.board")
+    rng = random.Random(8)
+    white = True
+
+    for _ in range(60):
+      expected = sum(piece.evaluate() for piece in self.board.iterate_cells_with_pieces(True)) \
+               - sum(piece.evaluate() for piece in self.board.iterate_cells_with_pieces(False))
+      self.assertAlmostEqual(expected, self.board.evaluate(), msg="Incremental evaluation must match the evaluation of all pieces")
+
+      moves = [(piece, cell) for piece in self.board.iterate_cells_with_pieces(white) for cell in piece.get_valid_cells()]
+      if not moves:
+        break
+
+      piece, cell = rng.choice(moves)
+      self.board.set_cell(cell, piece)
+      white = not white
+
+  @colorize(color=RED)
+  def test_D09_make_unmake_restores_position(self):
+    for backend in (Board, CompactBoard, BitBoard):
+      board = backend()
+      board.load_from_disk("tests/random1.board")
+      rng = random.Random(9)
+      white = True
+
+      for _ in range(40):
+        moves = [(piece, cell) for piece in board.iterate_cells_with_pieces(white) for cell in piece.get_valid_cells()]
+        if not moves:
+          break
+
+        before = (board.hash(), board.zobrist, board.material, board.find_king(True), board.find_king(False))
+        depth = len(board.undo_stack)
+        for piece, cell in moves:
+          origin = piece.cell
+          board.make_move(piece, cell)
+          board.unmake_move()
+          self.assertEqual(before, (board.hash(), board.zobrist, board.material, board.find_king(True), board.find_king(False)),
+                           msg=f"{backend.__name__}: make_move/unmake_move must restore the position")
+          self.assertTrue(all(a == b for a, b in zip(origin, piece.cell)), msg="Piece must be back on its cell")
+        self.assertEqual(depth, len(board.undo_stack))
+
+        piece, cell = rng.choice(moves)
+        board.make_move(piece, cell)
+        copy = board.copy()
+        self.assertEqual((copy.zobrist, copy.material), (board.zobrist, board.material),
+                         msg=f"{backend.__name__}: make_move must update the zobrist key and material incrementally")
+        white = not white
+
+      # Taking back the whole game must lead back to the loaded position
+      while board.undo_stack:
+        board.unmake_move()
+      reference = Board()
+      reference.load_from_disk("tests/random1.board")
+      self.assertEqual(reference.hash(), board.hash())
+      self.assertEqual(reference.zobrist, board.zobrist)
+
+  @colorize(color=RED)
+  def test_D10_perft(self):
+    self.board.reset()
+    self.assertEqual([1, 20, 400, 8902], [perft(self.board, depth) for depth in range(4)])
+    self.assertEqual([], self.board.undo_stack)
+
+    for backend in (Board, CompactBoard, BitBoard):
+      board = backend()
+      board.load_from_disk("tests/random1.board")
+      before = board.hash()
+      self.assertEqual(1415, perft(board, 2), msg=f"{backend.__name__}: perft must not depend on the backend")
+      self.assertEqual(before, board.hash(), msg="perft must restore the board")
+
+      split = divide(board, 2, False)
+      self.assertEqual(perft(board, 2, False), sum(split.values()))
+
+    report = benchmark.run_perft_benchmark(depth=1)
+    self.assertEqual(set(benchmark.BACKENDS), set(report["backends"]))
+    self.assertEqual(1, len({result["nodes"] for result in report["backends"].values()}),
+                     msg="All backends must count the same perft nodes")
+
+  @colorize(color=RED)
+  def test_D11_search_benchmark_report(self):
+    first = benchmark.run_benchmark(max_depth=2, backend=CompactBoard)
+    second = json.loads(json.dumps(benchmark.run_benchmark(max_depth=2, backend=CompactBoard)))
+
+    self.assertEqual(len(first["searches"]), len(second["searches"]))
+    for a, b in zip(first["searches"], second["searches"]):
+      self.assertEqual((a["position"], a["depth"], a["move"], a["nodes"]), (b["position"], b["depth"], b["move"], b["nodes"]),
+                       msg="Seeded benchmark runs must search the same tree")
+      self.assertGreater(a["nodes"], 0)
+
+      # Every search starts with empty caches, so the hit rates do not depend on earlier searches
+      for rate in ("eval_cache_hit_rate", "check_cache_hit_rate", "legal_move_cache_hit_rate"):
+        self.assertTrue(0.0 <= a[rate] <= 1.0)
+        self.assertEqual(a[rate], b[rate], f"{a['position']} depth {a['depth']}: {rate}")
+
+  @colorize(color=RED)
+  def test_D12_seeded_and_deterministic_search(self):
+    def search(config):
+      engine.eval_cache.clear()
+      board = Board()
+      board.load_from_disk("tests/random1.board")
+      moves = [engine.suggest_move(board, config=config) for _ in range(5)]
+      return [(cell_to_string(move.piece.cell), cell_to_string(move.cell), move.score) for move in moves]
+
+    # Without jitter the scores are plain material values
+    deterministic = search(engine.EngineConfig(deterministic=True))
+    self.assertEqual(1, len(set(deterministic)), "Deterministic searches must always give the same result")
+    self.assertEqual(deterministic[0][2], round(deterministic[0][2]))
+
+    # With the same seed, the random variations repeat as well
+    self.assertEqual(search(engine.EngineConfig(seed=42, random_move_chance=50)),
+                     search(engine.EngineConfig(seed=42, random_move_chance=50)))
+    engine.eval_cache.clear()
+
+  @colorize(color=RED)
+  def test_D13_parallel_root_search_matches_serial(self):
+    board = CompactBoard()
+    board.load_from_hash(self.board.hash())
+    self.assertEqual(self.board.hash(), board.hash())
+    self.assertEqual(self.board.zobrist, board.zobrist)
+
+    try:
+      for fname in ("tests/random1.board", "tests/random2.board"):
+        for alphaBeta in (False, True):
+          results = []
+          for workers in (1, 2):
+            engine.eval_cache.clear()
+            board.load_from_disk(fname)
+            move = engine.suggest_move(board, alphaBeta, config=engine.EngineConfig(deterministic=True, workers=workers))
+            results.append((cell_to_string(move.piece.cell), cell_to_string(move.cell), move.score))
+
+          self.assertEqual(results[0], results[1], f"{fname}: parallel search must match the serial search")
+
+      # A single ply with quiescence search sees the recapture of the covered pawn like the serial search
+      for alphaBeta in (False, True):
+        engine.eval_cache.clear()
+        board.load_from_fen("4k3/8/4p3/3p4/8/8/8/3QK3 w - - 0 1")
+        move = engine.suggest_move(board, alphaBeta, config=engine.EngineConfig(1, deterministic=True, workers=2, quiescence=True))
+        self.assertNotEqual("d5", cell_to_string(move.cell), "The parallel search must run the quiescence search at depth 1")
+    finally:
+      engine.shutdown_executor()
+      engine.eval_cache.clear()
+
+  @colorize(color=RED)
+  def test_D14_shared_transposition_table(self):
+    table = SharedTranspositionTable(size_mb=1)
+    key = self.board.zobrist
+    try:
+      table.store(key, True, 3, 12.0, EXACT, 1 * 8 + 4, 3 * 8 + 4)
+      table.store(key, False, 3, -7.0, LOWER_BOUND)
+      self.assertEqual((12.0, EXACT, 12, 28), tuple(table.probe(key, True, 3)[3:]))
+      self.assertEqual((-7.0, LOWER_BOUND, None, None), tuple(table.probe(key, False, 3)[3:]))
+      self.assertIsNone(table.probe(key, True, 2))
+
+      # Another process sees the entries and its entries are visible here
+      with ProcessPoolExecutor(max_workers=1) as executor:
+        entry = executor.submit(probe_shared_table, table, key, True, 3).result()
+      self.assertEqual(12.0, entry.score)
+      self.assertEqual(-1.5, table.probe(key ^ 1, True, 3).score)
+
+      # A torn slot (data written by another process in between) no longer matches the checksum
+      index = SHARED_HEADER_SIZE + table._index(key, True) * 24 + 16
+      table.memory.buf[index] ^= 1
+      self.assertIsNone(table.probe(key, True, 3), "A slot with a wrong checksum must be ignored")
+
+      self.assertFalse(table.stopped())
+      table.stop()
+      self.assertTrue(table.stopped())
+    finally:
+      table.close()
+
+    try:
+      for fname in ("tests/random1.board", "tests/random2.board"):
+        scores = []
+        for workers, lazy_smp in ((1, False), (3, True)):
+          engine.eval_cache.clear()
+          self.board.load_from_disk(fname)
+          move = engine.suggest_move(self.board, True, config=engine.EngineConfig(deterministic=True, workers=workers, lazy_smp=lazy_smp))
+          self.assertIn(tuple(move.cell), [tuple(cell) for cell in move.piece.get_valid_cells()])
+          scores.append(move.score)
+
+        self.assertEqual(scores[0], scores[1], f"{fname}: Lazy SMP search must find the score of the serial search")
+    finally:
+      engine.shutdown_executor()
+      engine.eval_cache.clear()
+
+    # The main search uses what the helpers stored: Run them first (in this process), then more probes of the main search
+    # find a result and it searches fewer nodes than the serial search
+    board = CompactBoard()
+    local_cache = engine.eval_cache
+    try:
+      for fname in ("start", "tests/random1.board", "tests/random2.board"):
+        load_position(board, fname)
+        config = engine.EngineConfig(4, deterministic=True)
+
+        engine.eval_cache = TranspositionTable()
+        engine.start_search(config)
+        engine.total_nodes = 0
+        serial = engine.minMaxAlphaBeta_cached(board, MinMaxArg(config=config))
+        serial_nodes, serial_rate = engine.total_nodes, engine.eval_cache.hits / engine.eval_cache.probes
+
+        table = SharedTranspositionTable(size_mb=1)
+        try:
+          for helper in (1, 2):
+            engine._lazy_smp_helper(CompactBoard, board.hash(), pickle.loads(pickle.dumps(table)), 4, True, config, helper)
+
+          engine.eval_cache = table
+          engine.start_search(config)
+          engine.total_nodes = 0
+          self.assertEqual(serial.score, engine.minMaxAlphaBeta_cached(board, MinMaxArg(config=config)).score, fname)
+          self.assertLess(engine.total_nodes, serial_nodes, f"{fname}: The helpers should save the main search nodes")
+          self.assertGreater(table.hits / table.probes, serial_rate, f"{fname}: The main search should find the results of the helpers")
+        finally:
+          table.close()
+    finally:
+      engine.eval_cache = local_cache
+      engine.clear_move_ordering()
+
+  @colorize(color=RED)
+  def test_D15_analyse_batch(self):
+    positions = []
+    for fname in sorted(glob.glob("tests/*.board")):
+      with open(fname, "rt") as f:
+        positions.append(f.read())
+
+    engine.eval_cache.clear()
+    serial = list(analyse_batch(positions * 3, depth=2))
+    parallel = list(analyse_batch(iter(positions * 3), depth=2, workers=2, chunk_size=2))
+    engine.eval_cache.clear()
+
+    self.assertEqual(list(range(3 * len(positions))), [result.index for result in parallel], "Results must come in the order of the positions")
+    self.assertEqual([result[:4] for result in serial], [result[:4] for result in parallel])
+
+    board = CompactBoard()
+    board.load_from_disk("tests/random1.board")
+    move = engine.minMaxAlphaBeta_cached(board, MinMaxArg(2, config=engine.EngineConfig(deterministic=True)))
+    index = sorted(glob.glob("tests/*.board")).index("tests/random1.board")
+    self.assertEqual((cell_to_string(move.piece.cell), cell_to_string(move.cell), move.score), tuple(serial[index][1:4]))
+    engine.eval_cache.clear()
+
+  @colorize(color=RED)
+  def test_D16_position_files(self):
+    hashes = []
+    for fname in sorted(glob.glob("tests/*.board")):
+      self.board.load_from_disk(fname)
+      hashes.append(self.board.hash())
+
+    with tempfile.TemporaryDirectory() as directory:
+      fname = os.path.join(directory, "corpus.positions")
+      with PositionWriter(fname) as writer:
+        for hash in hashes:
+          self.board.load_from_hash(hash)
+          writer.write(self.board)
+      self.assertEqual(len(hashes), write_positions(fname, reversed(hashes)), "Writing must append to the file")
+
+      expected = hashes + hashes[::-1]
+      self.assertEqual(expected, list(read_positions(fname)))
+      self.assertEqual(expected[5:], list(read_positions(fname, start=5)))
+
+      with PositionFile(fname) as positions:
+        self.assertEqual(len(expected), len(positions))
+        self.assertEqual(expected[3], positions[3])
+        self.assertEqual(expected[-1], positions[-1])
+        self.assertRaises(IndexError, lambda: positions[len(expected)])
+
+        board = CompactBoard()
+        positions.load(board, 6)
+        self.assertEqual(expected[6], board.hash())
+
+        # A recorded corpus can be fed into the batch analysis, which finds the same moves as for the board files
+        configurations = []
+        for boardFile in sorted(glob.glob("tests/*.board")):
+          with open(boardFile, "rt") as f:
+            configurations.append(f.read())
+
+        engine.eval_cache.clear()
+        recorded = [result[:4] for result in analyse_batch(positions, depth=2, loader="load_from_hash")]
+        self.assertEqual(len(expected), len(recorded))
+        parallel = analyse_batch(read_positions(fname), depth=2, workers=2, loader="load_from_hash")
+        self.assertEqual(recorded, [result[:4] for result in parallel])
+        engine.eval_cache.clear()
+        self.assertEqual([result[1:4] for result in analyse_batch(configurations, depth=2)], [result[1:4] for result in recorded[:len(hashes)]])
+        engine.eval_cache.clear()
+
+    self.assertRaises(ValueError, lambda: write_positions(os.devnull, ["too short"]))
+
+  @colorize(color=RED)
+  def test_D17_fen(self):
+    start = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+    self.board.reset()
+    self.assertEqual("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1", self.board.to_fen())
+
+    reference = Board()
+    reference.reset()
+    for backend in (Board, CompactBoard, BitBoard):
+      board = backend()
+      self.assertTrue(board.load_from_fen(start))
+      self.assertEqual(reference.hash(), board.hash())
+      self.assertEqual(reference.zobrist, board.zobrist)
+
+      self.assertFalse(board.load_from_fen("4k3/8/8/8/8/8/4P3/4K3 b - - 0 1"))
+      self.assertFalse(board.white_to_move)
+      self.assertEqual("4k3/8/8/8/8/8/4P3/4K3 b - - 0 1", board.to_fen())
+      self.assertEqual("4k3/8/8/8/8/8/4P3/4K3 w - - 0 1", board.to_fen(True))
+
+      # The other loaders do not know the side to move, white moves first after them
+      for load, value in ((board.load_from_memory, str(reference)), (board.load_from_hash, reference.hash()), (board.reset, None)):
+        board.load_from_fen("4k3/8/8/8/8/8/4P3/4K3 b - - 0 1")
+        load() if value is None else load(value)
+        self.assertTrue(board.white_to_move, f"{backend.__name__}.{load.__name__} should reset the side to move")
+        self.assertEqual(start.replace("KQkq", "-"), board.to_fen())
+
+      # Every test board survives the round trip
+      for fname in glob.glob("tests/*.board"):
+        self.board.load_from_disk(fname)
+        board.load_from_fen(self.board.to_fen())
+        self.assertEqual(self.board.hash(), board.hash(), fname)
+        self.assertEqual(self.board.zobrist, board.zobrist, fname)
+        self.assertEqual(self.board.material, board.material, fname)
+
+    for invalid in ("", "8/8/8/8/8/8/8 w", "9/8/8/8/8/8/8/8", "8/8/8/8/8/8/8/7x", "8/8/8/8/8/8/8/8 x", "ppppppppp/8/8/8/8/8/8/8"):
+      self.assertRaises(ValueError, self.board.load_from_fen, invalid)
+
+    report = benchmark.run_load_benchmark(repeat=2)
+    self.assertGreater(report["load_from_fen"]["positions_per_second"], 0)
+
+  @colorize(color=RED)
+  def test_D18_move_ordering(self):
+    # Captures come first, the most valuable victim first
+    board = CompactBoard()
+    board.load_from_fen("4k3/8/8/3q1r2/4P3/8/8/4K2Q w - - 0 1")
+    config = engine.EngineConfig(deterministic=True)
+    moves = evaluate_all_possible_moves(board, MinMaxArg(1, config=config), maximumNumberOfMoves=500)
+    ordered = engine.order_moves(board, moves, MinMaxArg(1, config=config))
+    self.assertEqual(["d5", "f5"], [cell_to_string(move.cell) for move in ordered[:2]])
+    self.assertEqual("e4", cell_to_string(ordered[0].piece.cell), "The least valuable attacker should capture first")
+
+    # Ordering must not change the score of the search
+    nodes = [0, 0]
+    for fname in ("tests/random1.board", "tests/random2.board", "start"):
+      scores = []
+      for index, move_ordering in enumerate((False, True)):
+        engine.eval_cache.clear()
+        engine.clear_move_ordering()
+        engine.total_nodes = 0
+        load_position(board, fname)
+        config = engine.EngineConfig(4, deterministic=True, move_ordering=move_ordering)
+        scores.append(engine.minMaxAlphaBeta_cached(board, MinMaxArg(config=config)).score)
+        nodes[index] += engine.total_nodes
+
+      self.assertEqual(scores[0], scores[1], fname)
+
+    self.assertLess(nodes[1], nodes[0], "Move ordering should search fewer nodes")
+
+    # Quiet moves causing cutoffs in the start position become killer moves
+    self.assertTrue(any(engine.killer_moves), "Cutoffs should be recorded as killer moves")
+    self.assertTrue(any(engine.history_table[True]) or any(engine.history_table[False]), "Cutoffs should be recorded in the history table")
+
+    # The history can break ties in the beam
+    moves = evaluate_all_possible_moves(board, MinMaxArg(1, config=engine.EngineConfig(deterministic=True, history_beam=True)))
+    self.assertEqual(10, len(moves))
+
+    # Killers and history left over from earlier searches must not change the result of a deterministic search
+    results = []
+    for _ in range(3):
+      engine.eval_cache.clear()
+      load_position(board, "start")
+      config = engine.EngineConfig(4, deterministic=True)
+      move = engine.suggest_move(board, True, config=config)
+      engine.eval_cache.clear()
+      engine.start_search(config)
+      reply = engine.minMaxAlphaBeta_cached(board, MinMaxArg(4, False, config=config))
+      results.append((str(move), str(reply)))
+    self.assertEqual(1, len(set(results)), "Deterministic searches must always give the same result")
+
+    engine.clear_move_ordering()
+    engine.eval_cache.clear()
+
+  @colorize(color=RED)
+  def test_D19_quiescence_search(self):
+    # The pawn on d5 is covered by the pawn on e6, taking it costs the queen
+    board = CompactBoard()
+    board.load_from_fen("4k3/8/4p3/3p4/8/8/8/3QK3 w - - 0 1")
+
+    engine.eval_cache.clear()
+    plain = engine.minMaxAlphaBeta_cached(board, MinMaxArg(1, config=engine.EngineConfig(1, deterministic=True)))
+    self.assertEqual("d5", cell_to_string(plain.cell), "Without quiescence search the covered pawn looks like a free pawn")
+
+    for search in (engine.minMax_cached, engine.minMaxAlphaBeta_cached):
+      engine.eval_cache.clear()
+      move = search(board, MinMaxArg(1, config=engine.EngineConfig(1, deterministic=True, quiescence=True)))
+      self.assertNotEqual("d5", cell_to_string(move.cell), "The quiescence search should see the pawn recapture")
+      self.assertEqual(700, move.score)
+
+    # The cached result of a search without quiescence is not taken for a search with quiescence
+    engine.eval_cache.clear()
+    engine.minMaxAlphaBeta_cached(board, MinMaxArg(1, config=engine.EngineConfig(1, deterministic=True)))
+    move = engine.minMaxAlphaBeta_cached(board, MinMaxArg(1, config=engine.EngineConfig(1, deterministic=True, quiescence=True)))
+    self.assertNotEqual("d5", cell_to_string(move.cell), "Searches with quiescence must not share cached scores")
+
+    # Standing pat is better than losing the queen, the board is left as it was
+    fen = board.to_fen()
+    self.assertEqual(board.evaluate(), engine.quiescence(board, True))
+    self.assertEqual(fen, board.to_fen())
+
+    # After Qxd5 black wins the queen back
+    board.make_move(board.get_cell((0, 3)), (4, 3))
+    self.assertEqual(board.evaluate() - 900, engine.quiescence(board, False))
+
+    # Both searches agree with quiescence search
+    for fname in ("tests/random1.board", "tests/random2.board"):
+      board.load_from_disk(fname)
+      config = engine.EngineConfig(2, deterministic=True, quiescence=True)
+      engine.eval_cache.clear()
+      expected = engine.minMax_cached(board, MinMaxArg(config=config)).score
+      engine.eval_cache.clear()
+      self.assertEqual(expected, engine.minMaxAlphaBeta_cached(board, MinMaxArg(config=config)).score, fname)
+      self.assertEqual([], board.undo_stack)
+
+    engine.eval_cache.clear()
+
+  @colorize(color=RED)
+  def test_D20_engine_worker_posts_move(self):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    import ui
+
+    pygame.display.init()
+    worker = ui.EngineWorker(lambda board: engine.suggest_move(board, config=engine.EngineConfig(2, deterministic=True)))
+    try:
+      self.board.reset()
+      before = self.board.hash()
+      worker.start_search(self.board)
+
+      # The loop keeps running while the engine searches
+      events = []
+      deadline = time.perf_counter() + 10
+      while not events and time.perf_counter() < deadline:
+        events = [event for event in pygame.event.get() if event.type == ui.ENGINE_MOVE_EVENT]
+        time.sleep(0.001)
+
+      self.assertEqual(1, len(events), "The engine should post its move as event")
+      self.assertEqual(before, self.board.hash(), "The engine must search on a copy of the board")
+
+      piece = self.board.get_cell(events[0].move_from)
+      self.assertIsNotNone(piece)
+      self.assertIn(events[0].move_to, [tuple(int(v) for v in cell) for cell in piece.get_valid_cells()])
+    finally:
+      worker.stop()
+      worker.thread.join(10)
+      pygame.display.quit()
+    self.assertFalse(worker.thread.is_alive())
+
+  @colorize(color=RED)
+  def test_D21_pondering_fills_the_cache(self):
+    config = engine.EngineConfig(3, deterministic=True)
+    engine.eval_cache.clear()
+    self.board.reset()
+    self.board.make_move(self.board.get_cell((1, 4)), (3, 4))
+    before = self.board.hash()
+
+    # Interrupted pondering leaves the board intact
+    self.assertEqual(0, engine.ponder(self.board, False, lambda: True, config=config))
+    calls = iter(range(50))
+    self.assertEqual(0, engine.ponder(self.board, False, lambda: next(calls) >= 49, config=config))
+    self.assertEqual(before, self.board.hash())
+    self.assertEqual(1, len(self.board.undo_stack))
+
+    self.assertEqual(3, engine.ponder(self.board, False, lambda: False, config=config, replies=3))
+    self.assertEqual(before, self.board.hash())
+
+    # The most likely reply is answered from the cache
+    reply = evaluate_all_possible_moves(self.board, MinMaxArg(1, False, config=config), 3)[0]
+    self.board.make_move(reply.piece, reply.cell)
+    engine.total_nodes = 0
+    move = engine.suggest_move(self.board, config=config)
+    self.assertEqual(0, engine.total_nodes, "A pondered reply should not need another search")
+
+    engine.eval_cache.clear()
+    self.assertEqual(move.score, engine.suggest_move(self.board, config=config).score)
+    self.assertGreater(engine.total_nodes, 0)
+    engine.eval_cache.clear()
+
+  @colorize(color=RED)
+  def test_D22_renderer_only_redraws_changes(self):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    import ui
+
+    pygame.display.init()
+    try:
+      screen = pygame.display.set_mode((820, 800))
+      sprites = ui.load_sprites()
+      renderer = ui.Renderer(screen, sprites)
+      reference = pygame.Surface((820, 800))
+      uiState = ui.UIState()
+      self.board.reset()
+
+      def draw(expectedDirty):
+        dirty = renderer.draw(self.board, uiState)
+        self.assertEqual(expectedDirty, len(dirty))
+
+        # The result must look exactly like drawing everything
+        ui.draw_checker_pattern(reference, uiState)
+        ui.draw_board(reference, sprites, self.board)
+        for x in range(0, 820, 7):
+          for y in range(0, 800, 7):
+            self.assertEqual(reference.get_at((x, y)), screen.get_at((x, y)), f"Pixel {x}, {y} differs")
+
+      draw(65)
+      draw(0)
+
+      uiState.mouse_over_cell = (1, 4)
+      draw(1)
+
+      uiState.dragging = True
+      uiState.selected_cell = (1, 4)
+      uiState.valid_cells = self.board.get_cell((1, 4)).get_valid_cells()
+      draw(3)
+
+      uiState.mouse_over_cell = (3, 6)
+      draw(9)
+
+      uiState.dragging = False
+      uiState.valid_cells = None
+      self.board.set_cell((3, 6), self.board.get_cell((1, 4)))
+      uiState.score = 3.0
+      draw(11)
+      draw(0)
+
+      # The marker of the thinking engine stays on the bar and moves in steps of 100ms
+      self.assertEqual(ui.thinking_marker(1200), ui.thinking_marker(1299))
+      self.assertNotEqual(ui.thinking_marker(1299), ui.thinking_marker(1300))
+      self.assertTrue(all(0 <= ui.thinking_marker(ticks) <= 780 for ticks in range(0, 10000, 100)))
+    finally:
+      pygame.display.quit()
+
+  @colorize(color=RED)
+  def test_D23_legal_move_cache(self):
+    cache = LRUCache(2)
+    cache.put(1, "a")
+    cache.put(2, "b")
+    self.assertEqual("a", cache.get(1))
+    cache.put(3, "c")
+    self.assertNotIn(2, cache, "The least recently used entry should be evicted")
+    self.assertEqual(["a", None, "c"], [cache.get(key) for key in (1, 2, 3)])
+    self.assertEqual((3, 1), (cache.hits, cache.misses))
+    cache.resize(1)
+    self.assertEqual(1, len(cache))
+
+    board_module.legal_move_cache.clear()
+    for backend in (Board, CompactBoard, BitBoard):
+      board = backend()
+      board.load_from_disk("tests/random2.board")
+
+      for white in (True, False):
+        expected = {}
+        for piece in board.iterate_cells_with_pieces(white):
+          cells = [tuple(int(v) for v in cell) for cell in piece.get_valid_cells()]
+          self.assertEqual(cells, [tuple(int(v) for v in cell) for cell in piece.get_valid_cells_cached()])
+          expected[tuple(int(v) for v in piece.cell)] = cells
+
+        moves = board.get_valid_moves(white)
+        self.assertEqual(expected, {divmod(square, 8): [tuple(int(v) for v in cell) for cell in cells] for square, cells in moves.items()})
+
+    # All boards share the cache, so the same position is only generated once
+    hits = board_module.legal_move_cache.hits
+    self.board.load_from_disk("tests/random2.board")
+    self.board.get_valid_moves(True)
+    self.assertEqual(hits + 1, board_module.legal_move_cache.hits)
+
+    # The cache is keyed by position and side, a move leads to another entry
+    piece = next(self.board.iterate_cells_with_pieces(True))
+    self.board.make_move(piece, piece.get_valid_cells()[0])
+    misses = board_module.legal_move_cache.misses
+    self.board.get_valid_moves(False)
+    self.assertEqual(misses + 1, board_module.legal_move_cache.misses)
+
+
+  @colorize(color=RED)
+  def test_D24_bounded_check_cache(self):
+    # All boards share one check cache unless they are given their own
+    self.assertIs(board_module.shared_check_cache, self.board.check_cache)
+    self.assertIs(board_module.shared_check_cache, CompactBoard().check_cache)
+
+    cache = LRUCache(2)
+    boards = [backend(cache) for backend in (Board, CompactBoard, BitBoard)]
+    for board in boards:
+      self.assertIs(cache, board.check_cache)
+      board.load_from_disk("tests/random2.board")
+
+    # The first board fills the cache, the others find the same positions in it
+    for white in (True, False):
+      self.assertEqual(boards[0].is_king_check(white), boards[0].is_king_check_cached(white))
+    self.assertEqual((0, 2), (cache.hits, cache.misses))
+    for board in boards[1:]:
+      for white in (True, False):
+        self.assertEqual(board.is_king_check(white), board.is_king_check_cached(white))
+    self.assertEqual((4, 2), (cache.hits, cache.misses))
+
+    # The cache never grows beyond its capacity
+    piece = next(boards[0].iterate_cells_with_pieces(True))
+    boards[0].make_move(piece, piece.get_valid_cells()[0])
+    boards[0].is_king_check_cached(False)
+    self.assertEqual(2, len(cache))
+    self.assertNotIn(boards[1].zobrist << 1 | True, cache, "The least recently used result should be evicted")
+
+    cache.resize(1)
+    self.assertEqual(1, len(cache))
+
+
+def probe_shared_table(table, key, white, depth):
+  entry = table.probe(key, white, depth)
+  table.store(key ^ 1, white, depth, -1.5, LOWER_BOUND)
+  table.close()
+  return entry
+
 
 if __name__ == "__main__":
   unittest.main()
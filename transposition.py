@@ -0,0 +1,307 @@
+import struct
+from collections import namedtuple
+from multiprocessing import resource_tracker, shared_memory
+
+# Bound types of a stored score
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Approximate memory (in bytes) of one stored entry including its slot in the table
+ENTRY_SIZE = 192
+
+# Mixed into the key of positions with black to move, so both sides land in different buckets
+SIDE_KEY = 0x9E3779B97F4A7C15
+
+TranspositionEntry = namedtuple(
+    "TranspositionEntry", ["key", "white", "depth", "score", "bound", "move_from", "move_to"]
+)
+
+
+class TranspositionTable:
+    """
+    A transposition table with a fixed memory budget for the mini-max search.
+
+    Entries are identified by the zobrist key of the board, the side to move and the search depth.
+    Every bucket has two slots: the first one keeps the deepest result seen so far (depth-preferred),
+    the second one takes everything that doesn't go into the first one (always-replace).
+    As the number of buckets is fixed, the table never grows beyond its budget.
+    """
+
+    def __init__(self, size_mb=16):
+        """
+        Constructor, allocates all buckets up front
+
+        :param size_mb: Memory budget of the table in megabytes
+        """
+        self.buckets = max(1, (size_mb * 1024 * 1024) // (2 * ENTRY_SIZE))
+        self.entries = [None] * (2 * self.buckets)
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def __len__(self):
+        """
+        Returns the number of occupied slots
+        """
+        return sum(1 for entry in self.entries if entry is not None)
+
+    def clear(self):
+        """
+        Removes all entries and resets the statistics
+        """
+        self.entries = [None] * (2 * self.buckets)
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def _index(self, key, white):
+        """
+        Returns the index of the first slot of the bucket the given position belongs to
+        """
+        if not white:
+            key ^= SIDE_KEY
+        return (key % self.buckets) * 2
+
+    def probe(self, key, white, depth):
+        """
+        Looks up the entry for the given position.
+
+        Only entries searched with exactly the requested depth are returned. The search only looks at a beam
+        of the best moves per position, so results of different depths can not be substituted for each other.
+
+        :param key: Zobrist key of the board
+        :param white: True if white is to move
+        :param depth: Remaining search depth
+        :return: The :py:class:`TranspositionEntry` or None if the position is not known
+        """
+        self.probes += 1
+        index = self._index(key, white)
+        for entry in (self.entries[index], self.entries[index + 1]):
+            if entry is not None and entry.key == key and entry.white == white and entry.depth == depth:
+                self.hits += 1
+                return entry
+
+        return None
+
+    def best_move(self, key, white):
+        """
+        Returns the best move stored for the given position by a search of any depth (the hash move).
+        It is only a hint for the move order, so it does not count as probe.
+
+        :param key: Zobrist key of the board
+        :param white: True if white is to move
+        :return: The squares (move_from, move_to) of the move or None if there is none
+        """
+        index = self._index(key, white)
+        return _best_move(key, white, (self.entries[index], self.entries[index + 1]))
+
+    def store(self, key, white, depth, score, bound, move_from=None, move_to=None):
+        """
+        Stores a search result.
+
+        :param key: Zobrist key of the board
+        :param white: True if white is to move
+        :param depth: Remaining search depth
+        :param score: Score of the position (from whites perspective)
+        :param bound: One of EXACT, LOWER_BOUND or UPPER_BOUND
+        :param move_from: Square (row * 8 + col) the best move starts on, None if there was no move
+        :param move_to: Square (row * 8 + col) the best move ends on, None if there was no move
+        """
+        self.stores += 1
+        index = self._index(key, white)
+        entry = TranspositionEntry(key, white, depth, score, bound, move_from, move_to)
+
+        # Depth-preferred slot: take it if it is empty or holds a shallower result
+        preferred = self.entries[index]
+        if preferred is None or preferred.depth <= depth:
+            self.entries[index] = entry
+        else:
+            self.entries[index + 1] = entry
+
+
+# Layout of one slot of the shared table: checksum, packed entry data and score
+SHARED_SLOT = struct.Struct("<QQd")
+# The slots of the shared table follow a header, its first byte is the stop flag
+SHARED_HEADER_SIZE = 8
+NO_SQUARE = 0xFF
+OCCUPIED = 1 << 40
+
+
+class SharedTranspositionTable:
+    """
+    A transposition table in shared memory (see multiprocessing.shared_memory), so several processes
+    searching the same position can use each others results. It has the same interface as :py:class:`TranspositionTable`.
+
+    Every slot has a fixed size of three 64 bit words: a checksum, the packed entry data and the score.
+    The processes read and write the slots without any locks. Instead the checksum is the zobrist key XOR the other
+    two words, so a slot torn by two processes writing at the same time no longer matches its key and is ignored
+    (lockless hashing). The statistics are counted per process.
+
+    Pickling the table only transfers the name of the shared memory block, the receiving process attaches to it.
+    The block also holds a stop flag, so one process can tell the others to end their search.
+    """
+
+    def __init__(self, size_mb=16, name=None):
+        """
+        Constructor, creates a new shared memory block or attaches to an existing one
+
+        :param size_mb: Memory budget of the table in megabytes
+        :param name: Name of an existing shared table to attach to, None creates a new one
+        """
+        self.buckets = max(1, (size_mb * 1024 * 1024) // (2 * SHARED_SLOT.size))
+        self.size_mb = size_mb
+        self.owner = name is None
+
+        if self.owner:
+            size = SHARED_HEADER_SIZE + 2 * self.buckets * SHARED_SLOT.size
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+            self.memory.buf[:size] = bytes(size)
+        else:
+            # Attaching registers the block with the resource tracker of this process. That is not always the one
+            # of the creator (e.g. pool processes forked before the creator started its tracker), and such a tracker
+            # would warn about a leak and try to remove the block again at exit. Only the creator keeps it tracked.
+            self.memory = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(self.memory._name, "shared_memory")
+
+        self.name = self.memory.name
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def __getstate__(self):
+        return self.size_mb, self.name
+
+    def __setstate__(self, state):
+        size_mb, name = state
+        self.__init__(size_mb, name)
+
+    def __len__(self):
+        """
+        Returns the number of occupied slots
+        """
+        return sum(1 for slot in range(2 * self.buckets) if self._unpack(slot)[1] & OCCUPIED)
+
+    def clear(self):
+        """
+        Removes all entries (for all processes), resets the stop flag and the statistics
+        """
+        size = SHARED_HEADER_SIZE + 2 * self.buckets * SHARED_SLOT.size
+        self.memory.buf[:size] = bytes(size)
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def stop(self):
+        """
+        Sets the stop flag for all processes using this table
+        """
+        self.memory.buf[0] = 1
+
+    def stopped(self):
+        """
+        Returns True once any process has called :py:meth:`stop`
+        """
+        return self.memory.buf[0] != 0
+
+    def close(self):
+        """
+        Detaches from the shared memory, the creator also removes the block
+        """
+        self.memory.close()
+        if self.owner:
+            # An attaching process sharing the tracker of the creator has unregistered the block there,
+            # register it again so unlinking does not unregister an unknown block
+            resource_tracker.register(self.memory._name, "shared_memory")
+            self.memory.unlink()
+
+    def _index(self, key, white):
+        """
+        Returns the index of the first slot of the bucket the given position belongs to
+        """
+        if not white:
+            key ^= SIDE_KEY
+        return (key % self.buckets) * 2
+
+    def _unpack(self, slot):
+        """
+        Returns the raw words (checksum, data, score) of the given slot
+        """
+        return SHARED_SLOT.unpack_from(self.memory.buf, SHARED_HEADER_SIZE + slot * SHARED_SLOT.size)
+
+    def _read(self, slot):
+        """
+        Returns the entry in the given slot or None if the slot is empty
+        """
+        check, data, score = self._unpack(slot)
+        if not data & OCCUPIED:
+            return None
+
+        key = check ^ data ^ _double_bits(score)
+        move_from = (data >> 24) & 0xFF
+        move_to = (data >> 32) & 0xFF
+        return TranspositionEntry(
+            key, bool((data >> 16) & 1), data & 0xFF, score, (data >> 8) & 0xFF,
+            None if move_from == NO_SQUARE else move_from, None if move_to == NO_SQUARE else move_to,
+        )
+
+    def probe(self, key, white, depth):
+        """
+        Looks up the entry for the given position, see :py:meth:`TranspositionTable.probe`
+        """
+        self.probes += 1
+        index = self._index(key, white)
+        for slot in (index, index + 1):
+            entry = self._read(slot)
+            if entry is not None and entry.key == key and entry.white == white and entry.depth == depth:
+                self.hits += 1
+                return entry
+
+        return None
+
+    def best_move(self, key, white):
+        """
+        Returns the best move stored for the given position, see :py:meth:`TranspositionTable.best_move`
+        """
+        index = self._index(key, white)
+        return _best_move(key, white, (self._read(index), self._read(index + 1)))
+
+    def store(self, key, white, depth, score, bound, move_from=None, move_to=None):
+        """
+        Stores a search result, see :py:meth:`TranspositionTable.store`
+        """
+        self.stores += 1
+        index = self._index(key, white)
+
+        data = (
+            OCCUPIED | depth & 0xFF | bound << 8 | int(white) << 16
+            | (NO_SQUARE if move_from is None else move_from) << 24
+            | (NO_SQUARE if move_to is None else move_to) << 32
+        )
+        score = float(score)
+        check = key ^ data ^ _double_bits(score)
+
+        # Depth-preferred slot: take it if it is empty or holds a shallower result
+        preferred = self._read(index)
+        slot = index if preferred is None or preferred.depth <= depth else index + 1
+        SHARED_SLOT.pack_into(self.memory.buf, SHARED_HEADER_SIZE + slot * SHARED_SLOT.size, check, data, score)
+
+
+def _best_move(key, white, entries):
+    """
+    Returns the squares of the move of the deepest of the given entries belonging to the given position, or None
+    """
+    best = None
+    for entry in entries:
+        if entry is not None and entry.key == key and entry.white == white and entry.move_from is not None:
+            if best is None or entry.depth > best.depth:
+                best = entry
+
+    return None if best is None else (best.move_from, best.move_to)
+
+
+def _double_bits(value):
+    """
+    Returns the bits of the given float as 64 bit integer
+    """
+    return struct.unpack("<Q", struct.pack("<d", value))[0]
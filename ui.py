@@ -1,7 +1,19 @@
+import queue
+import threading
 import pygame
 import numpy as np
 from pieces import Piece, Pawn, Rook, Bishop, Queen, King, Knight
-from engine import suggest_move, suggest_random_move
+from engine import suggest_move, suggest_random_move, ponder
+
+# Frame rate while something on the screen changes and while nothing does
+FPS = 60
+IDLE_FPS = 10
+
+COLOR_WHITE = (240, 220, 190)
+COLOR_BLACK = (160, 110, 95)
+
+# Posted by the EngineWorker once a search is done, carries move_from, move_to (cells or None), score and the move as text
+ENGINE_MOVE_EVENT = pygame.USEREVENT + 1
 
 
 class UIState:
@@ -11,10 +23,82 @@ class UIState:
         self.selected_cell = None
         self.valid_cells = None
         self.score = 0.0
+        self.thinking = False
 
         pass
 
 
+class EngineWorker:
+    """
+    Runs the engine on a background thread, so the game loop keeps handling events and drawing while it searches.
+
+    Every search works on a copy of the board. The result is posted as ENGINE_MOVE_EVENT with the cells
+    of the move, which the game loop then applies to its own board.
+
+    While the opponent is thinking, the worker can ponder (see :py:func:`engine.ponder`) to fill the eval_cache
+    for the likely replies. Starting the next search ends pondering.
+    """
+
+    def __init__(self, search=suggest_move, pondering=True):
+        """
+        Constructor, starts the worker thread
+
+        :param search: Function returning the move for a board, e.g. suggest_move or suggest_random_move
+        :param pondering: Search on the opponents time, should only be used with suggest_move
+        """
+        self.search = search
+        self.pondering = pondering
+        self.requests = queue.Queue()
+
+        # Incremented by every search request, a ponder request ends as soon as it is outdated
+        self.generation = 0
+
+        self.thread = threading.Thread(target=self._run, name="engine", daemon=True)
+        self.thread.start()
+
+    def start_search(self, board):
+        """
+        Starts searching a move for the current configuration of the given board, ending any pondering
+        """
+        self.generation += 1
+        self.requests.put(("search", board.copy(), self.generation))
+
+    def start_ponder(self, board, opponentIsWhite=False):
+        """
+        Starts pondering the opponents replies in the current configuration of the given board
+        (if pondering is enabled). It goes on until the next call of start_search.
+        """
+        if self.pondering:
+            self.requests.put(("ponder", board.copy(), self.generation, opponentIsWhite))
+
+    def stop(self):
+        """
+        Lets the worker thread end after the current search
+        """
+        self.requests.put(None)
+
+    def _run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+
+            if request[0] == "ponder":
+                _, board, generation, opponentIsWhite = request
+                ponder(board, opponentIsWhite, lambda: self.generation != generation or not self.requests.empty())
+                continue
+
+            _, board, _ = request
+            move = self.search(board)
+            if move is None or move.piece is None:
+                event = pygame.event.Event(ENGINE_MOVE_EVENT, move_from=None, move_to=None,
+                                           score=move.score if move else 0.0, text=None)
+            else:
+                event = pygame.event.Event(ENGINE_MOVE_EVENT, move_from=tuple(int(v) for v in move.piece.cell),
+                                           move_to=tuple(int(v) for v in move.cell), score=move.score, text=str(move))
+            pygame.event.post(event)
+
+
 def load_sprites():
     return {
         "ROOK_WHITE": pygame.image.load(
@@ -80,18 +164,38 @@ def map_piece_to_sprite_tag(piece):
     return c + "_BLACK"
 
 
-def draw_checker_pattern(screen, uiState):
-    COLOR_WHITE = (240, 220, 190)
-    COLOR_BLACK = (160, 110, 95)
+def thinking_marker(ticks):
+    """
+    Returns the y position of the marker running up and down the evaluation bar while the engine is thinking.
+    It moves in steps of 100ms, so the bar does not need to be redrawn every frame.
 
-    screen.fill(COLOR_WHITE)
+    :param ticks: Milliseconds as returned by pygame.time.get_ticks
+    """
+    return abs(ticks // 100 * 50 % 1560 - 780)
 
-    winChance = 1.0 / (1.0 + np.exp(-uiState.score / 8.0))
+
+def draw_evaluation_bar(screen, score, marker=None):
+    """
+    Draws the evaluation bar for the given score and the marker at the given y position (see :py:func:`thinking_marker`)
+    """
+    winChance = 1.0 / (1.0 + np.exp(-score / 8.0))
 
     whiteRatio = 800 * winChance
     pygame.draw.rect(screen, (255, 255, 255), (800, 800 - whiteRatio, 20, whiteRatio))
     pygame.draw.rect(screen, (0, 0, 0), (800, 0, 20, 800 - whiteRatio))
 
+    if marker is not None:
+        pygame.draw.rect(screen, (255, 0, 0), (800, marker, 20, 20))
+
+
+def draw_checker_pattern(screen, uiState):
+    COLOR_WHITE = (240, 220, 190)
+    COLOR_BLACK = (160, 110, 95)
+
+    screen.fill(COLOR_WHITE)
+
+    draw_evaluation_bar(screen, uiState.score, thinking_marker(pygame.time.get_ticks()) if uiState.thinking else None)
+
     # Draw check board
     for row in range(8):
         for col in range(8):
@@ -147,6 +251,142 @@ def draw_board(screen, sprites, board):
                 screen.blit(sprite_to_draw, (x, y - 5))
 
 
+def cell_rect(row, col):
+    """
+    Returns the screen rectangle of the given cell
+    """
+    return pygame.Rect(col * 100, 700 - row * 100, 100, 100)
+
+
+class Renderer:
+    """
+    Draws the board like draw_checker_pattern and draw_board, but only redraws what changed since the last frame.
+
+    The empty checkerboard is rendered once into a surface. Every frame, the state of every cell (pieces,
+    valid cell marker, highlights, drag line) is compared to the one of the last frame and only the changed cells
+    (and the evaluation bar, if the score changed) are redrawn and passed to pygame.display.update.
+    """
+    BAR_RECT = pygame.Rect(800, 0, 20, 800)
+
+    def __init__(self, screen, sprites):
+        self.screen = screen
+        self.sprites = sprites
+
+        self.background = pygame.Surface((800, 800))
+        self.background.fill(COLOR_WHITE)
+        for row in range(8):
+            for col in range(8):
+                if (row + col) % 2 == 0:
+                    pygame.draw.rect(self.background, COLOR_BLACK, cell_rect(row, col))
+
+        self.cell_states = None
+        self.bar_state = None
+
+    def invalidate(self):
+        """
+        Redraws everything in the next frame
+        """
+        self.cell_states = None
+        self.bar_state = None
+
+    def _drag_line(self, uiState):
+        """
+        Returns the end points of the line drawn while dragging a piece or None
+        """
+        if not uiState.dragging or uiState.mouse_over_cell is None:
+            return None
+
+        row, col = uiState.mouse_over_cell
+        xFrom, yFrom = col * 100 + 50, 700 - row * 100 + 50
+        row, col = uiState.selected_cell
+        return (xFrom, yFrom), (col * 100 + 50, 700 - row * 100 + 50)
+
+    def _cell_states(self, board, uiState, line):
+        """
+        Returns everything that is drawn onto each cell. Pieces are drawn 5 pixels above their cell,
+        so the piece of the cell below shows in every cell as well.
+        """
+        valid_cells = set()
+        if uiState.valid_cells is not None:
+            valid_cells = {(int(row), int(col)) for row, col in uiState.valid_cells}
+
+        selected = tuple(uiState.selected_cell) if uiState.dragging else None
+        mouse_over = tuple(uiState.mouse_over_cell) if uiState.mouse_over_cell is not None else None
+        lineRect = None
+        if line is not None:
+            (x1, y1), (x2, y2) = line
+            lineRect = pygame.Rect(min(x1, x2) - 2, min(y1, y2) - 2, abs(x2 - x1) + 5, abs(y2 - y1) + 5)
+
+        states = {}
+        for row in range(8):
+            for col in range(8):
+                cell = (row, col)
+                states[cell] = (
+                    map_piece_to_sprite_tag(board.get_cell(cell)),
+                    map_piece_to_sprite_tag(board.get_cell((row - 1, col))) if row > 0 else None,
+                    cell in valid_cells,
+                    cell == selected,
+                    cell == mouse_over,
+                    line if lineRect is not None and lineRect.colliderect(cell_rect(row, col)) else None,
+                )
+        return states
+
+    def _draw_cell(self, cell, state):
+        """
+        Redraws a single cell, everything outside of it stays untouched
+        """
+        row, col = cell
+        rect = cell_rect(row, col)
+        tag, tagBelow, valid, selected, mouse_over, line = state
+
+        self.screen.set_clip(rect)
+        self.screen.blit(self.background, rect, rect)
+
+        if valid:
+            pygame.draw.circle(self.screen, (196, 196, 196), rect.center, 35)
+        if selected:
+            pygame.draw.rect(self.screen, (128, 0, 0), rect, 3)
+        if mouse_over:
+            pygame.draw.rect(self.screen, (255, 0, 0), rect, 3)
+        if line is not None:
+            pygame.draw.line(self.screen, (255, 0, 0), line[0], line[1], 3)
+
+        if tagBelow is not None:
+            self.screen.blit(self.sprites[tagBelow], (rect.x, rect.y + 95))
+        if tag is not None:
+            self.screen.blit(self.sprites[tag], (rect.x, rect.y - 5))
+
+        self.screen.set_clip(None)
+
+    def draw(self, board, uiState):
+        """
+        Draws the current frame and updates the changed parts of the display
+
+        :return: The list of updated rectangles, empty if nothing changed
+        """
+        line = self._drag_line(uiState)
+        states = self._cell_states(board, uiState, line)
+
+        dirty = []
+        for cell, state in states.items():
+            if self.cell_states is None or self.cell_states[cell] != state:
+                self._draw_cell(cell, state)
+                dirty.append(cell_rect(*cell))
+        self.cell_states = states
+
+        # The marker moves in steps, so the bar is not redrawn every frame while thinking
+        marker = thinking_marker(pygame.time.get_ticks()) if uiState.thinking else None
+        bar_state = (uiState.score, marker)
+        if bar_state != self.bar_state:
+            draw_evaluation_bar(self.screen, *bar_state)
+            dirty.append(self.BAR_RECT)
+        self.bar_state = bar_state
+
+        if dirty:
+            pygame.display.update(dirty)
+        return dirty
+
+
 def get_cell_under_mouse(uiState):
     mouse_pos = pygame.Vector2(pygame.mouse.get_pos())
 
@@ -167,6 +407,8 @@ def run_game(board, manual=False):
     screen = pygame.display.set_mode((820, 800))
 
     sprites = load_sprites()
+    renderer = Renderer(screen, sprites)
+    clock = pygame.time.Clock()
 
     pygame.display.set_caption("Hello Pygame")
 
@@ -176,27 +418,54 @@ def run_game(board, manual=False):
 
     nextMove = None
     whitesTurn = True
+    gameOver = False
+
+    engineWorker = EngineWorker(suggest_move)
+    # engineWorker = EngineWorker(suggest_random_move)
 
     while running:
-        if nextMove is None and not manual:
-            nextMove = suggest_move(board)
-            # nextMove = suggest_random_move(board)
-            print("Next Move is ", nextMove)
-            board.set_cell(nextMove.cell, nextMove.piece)
-            uiState.score = nextMove.score
-            displayScore = np.tanh(uiState.score / 8.0) * 4.0
-            print(f"Current Evaluation: {+displayScore:.2f}")
-            whitesTurn = False
+        if nextMove is None and not manual and not uiState.thinking and not gameOver:
+            engineWorker.start_search(board)
+            uiState.thinking = True
+            pygame.display.set_caption("Hello Pygame - thinking...")
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
 
+            # The window was uncovered or resized, its content might be gone
+            if event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                renderer.invalidate()
+
+            if event.type == ENGINE_MOVE_EVENT:
+                uiState.thinking = False
+                pygame.display.set_caption("Hello Pygame")
+
+                if event.move_from is None:
+                    print("No moves left")
+                    gameOver = True
+                    continue
+
+                nextMove = event
+                print("Next Move is ", event.text)
+                board.set_cell(event.move_to, board.get_cell(event.move_from))
+                uiState.score = event.score
+                displayScore = np.tanh(uiState.score / 8.0) * 4.0
+                print(f"Current Evaluation: {+displayScore:.2f}")
+                whitesTurn = False
+
+                # Use the time the human needs for the reply
+                engineWorker.start_ponder(board, opponentIsWhite=False)
+
+            # The board belongs to the engine until its move arrives
+            if uiState.thinking:
+                continue
+
             if event.type == pygame.MOUSEBUTTONDOWN:
                 piece = board.get_cell(uiState.mouse_over_cell)
                 if piece and piece.white == whitesTurn:
                     uiState.dragging = True
-                    uiState.valid_cells = piece.get_valid_cells()
+                    uiState.valid_cells = piece.get_valid_cells_cached()
                     uiState.selected_cell = uiState.mouse_over_cell
 
             if event.type == pygame.MOUSEBUTTONUP and uiState.dragging:
@@ -219,13 +488,14 @@ def run_game(board, manual=False):
 
                 uiState.valid_cells = None
 
-        draw_checker_pattern(screen, uiState)
-        draw_board(screen, sprites, board)
+        # Only the changed parts of the display are updated
+        dirty = renderer.draw(board, uiState)
 
         uiState = get_cell_under_mouse(uiState)
 
-        # Flip the display
-        pygame.display.flip()
+        # Limit the frame rate, sleep longer while nothing changes
+        clock.tick(FPS if dirty else IDLE_FPS)
 
     # Quit Pygame
+    engineWorker.stop()
     pygame.quit()